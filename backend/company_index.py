@@ -0,0 +1,157 @@
+"""
+Normalized company index for fast company filtering.
+
+Company names are casefolded, stripped of punctuation and legal suffixes
+(Inc, LLC, Ltd, ...) and mapped through an alias table, so "Uber Technologies,
+Inc." and "uber technologies" are the same company and "Facebook" finds Meta.
+An index over a result set groups its rows by normalized name once; lookups
+then only touch distinct company names, not every job.
+
+Match modes:
+- exact:  normalized names are equal
+- prefix: the query is a whole-word prefix ("uber" matches "Uber Freight", not "Uberall")
+- fuzzy:  prefix matches plus close spellings ("gogle" finds "Google")
+"""
+
+import difflib
+import functools
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MATCH_MODES = ("exact", "prefix", "fuzzy")
+FUZZY_CUTOFF = float(os.getenv("COMPANY_FUZZY_CUTOFF", "0.8"))
+
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "llp", "lp", "ltd", "limited", "corp", "corporation",
+    "co", "company", "plc", "gmbh", "ag", "sa", "bv", "nv", "pty", "pvt", "private"
+}
+
+# Normalized alias -> normalized canonical name; extend with COMPANY_ALIASES (JSON)
+DEFAULT_COMPANY_ALIASES = {
+    "facebook": "meta",
+    "meta platforms": "meta",
+    "alphabet": "google",
+    "amazon com": "amazon",
+    "aws": "amazon web services",
+    "international business machines": "ibm",
+    "jp morgan": "jpmorgan",
+    "jp morgan chase": "jpmorgan chase",
+    "pricewaterhousecoopers": "pwc",
+    "ernst and young": "ey",
+    "x corp": "x",
+    "twitter": "x",
+}
+
+def load_company_aliases() -> Dict[Tuple[str, ...], Tuple[str, ...]]:
+    aliases = dict(DEFAULT_COMPANY_ALIASES)
+    overrides = os.getenv("COMPANY_ALIASES")
+    if overrides:
+        aliases.update(json.loads(overrides))
+    # Keys and values go through the same cleanup as company names so either spelling works
+    return {_clean_tokens(alias): _clean_tokens(canonical) for alias, canonical in aliases.items()}
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+def _clean_tokens(name: str) -> Tuple[str, ...]:
+    tokens = _NON_WORD.sub(" ", name.casefold().replace("&", " and ")).split()
+    if tokens and tokens[0] == "the" and len(tokens) > 1:
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return tuple(tokens)
+
+COMPANY_ALIASES = load_company_aliases()
+_MAX_ALIAS_LENGTH = max((len(alias) for alias in COMPANY_ALIASES), default=0)
+
+@functools.lru_cache(maxsize=50000)
+def company_tokens(name: Optional[str]) -> Tuple[str, ...]:
+    """Normalized company name as a tuple of words ('' and None give an empty tuple)"""
+    if not name or not isinstance(name, str):
+        return ()
+    tokens = _clean_tokens(name)
+    # Replace the longest leading alias, e.g. ("meta", "platforms", "ireland") -> ("meta", "ireland")
+    for length in range(min(len(tokens), _MAX_ALIAS_LENGTH), 0, -1):
+        canonical = COMPANY_ALIASES.get(tokens[:length])
+        if canonical:
+            return canonical + tokens[length:]
+    return tokens
+
+def normalize_company(name: Optional[str]) -> str:
+    return " ".join(company_tokens(name))
+
+class CompanyIndex:
+    """Rows of one result set grouped by normalized company name"""
+
+    def __init__(self, jobs: List[dict]):
+        self._rows: Dict[Tuple[str, ...], List[int]] = {}
+        for row, job in enumerate(jobs):
+            tokens = company_tokens(job.get("company"))
+            if tokens:
+                self._rows.setdefault(tokens, []).append(row)
+
+        self._by_first_word: Dict[str, List[Tuple[str, ...]]] = {}
+        for tokens in self._rows:
+            self._by_first_word.setdefault(tokens[0], []).append(tokens)
+        self._lookups: Dict[Tuple[Tuple[str, ...], str], List[Tuple[str, ...]]] = {}
+
+    def companies(self, company: str, match: str = "prefix") -> List[Tuple[str, ...]]:
+        """Normalized company names in this result set matching one query"""
+        query = company_tokens(company)
+        if not query:
+            return []
+        cache_key = (query, match)
+        if cache_key not in self._lookups:
+            self._lookups[cache_key] = self._find(query, match)
+        return self._lookups[cache_key]
+
+    def _find(self, query: Tuple[str, ...], match: str) -> List[Tuple[str, ...]]:
+        if match == "exact":
+            return [query] if query in self._rows else []
+
+        found = [tokens for tokens in self._by_first_word.get(query[0], []) if tokens[:len(query)] == query]
+        if match == "fuzzy":
+            # Compare the query against the same number of leading words of each name
+            heads: Dict[str, List[Tuple[str, ...]]] = {}
+            for tokens in self._rows:
+                heads.setdefault(" ".join(tokens[:len(query)]), []).append(tokens)
+            for head in difflib.get_close_matches(" ".join(query), heads, n=10, cutoff=FUZZY_CUTOFF):
+                found.extend(tokens for tokens in heads[head] if tokens not in found)
+        return found
+
+    def rows(self, companies: Iterable[str], match: str = "prefix") -> List[int]:
+        """Row numbers (in original order) whose company matches any of the queries"""
+        rows = set()
+        for company in companies:
+            for tokens in self.companies(company, match):
+                rows.update(self._rows[tokens])
+        return sorted(rows)
+
+# Indexes for recent result sets, so repeat filters on the same set skip the build
+INDEX_CACHE_SIZE = 64
+_index_cache: "OrderedDict[str, Tuple[tuple, CompanyIndex]]" = OrderedDict()
+
+def _fingerprint(jobs: List[dict]) -> tuple:
+    # Row numbers depend only on the company column, so the index is valid exactly as
+    # long as that column is unchanged (a re-scrape under the same key may reorder rows)
+    companies = tuple(job.get("company") if isinstance(job.get("company"), str) else None for job in jobs)
+    return (len(jobs), hash(companies))
+
+def get_company_index(jobs: List[dict], key: Optional[str] = None) -> CompanyIndex:
+    """Company index for a result set, reused while `key` still holds the same company column"""
+    if key is None:
+        return CompanyIndex(jobs)
+
+    fingerprint = _fingerprint(jobs)
+    cached = _index_cache.get(key)
+    if cached and cached[0] == fingerprint:
+        _index_cache.move_to_end(key)
+        return cached[1]
+
+    index = CompanyIndex(jobs)
+    _index_cache[key] = (fingerprint, index)
+    if len(_index_cache) > INDEX_CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return index
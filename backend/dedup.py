@@ -0,0 +1,316 @@
+"""
+Cross-site deduplication of job postings.
+
+The same posting scraped from Indeed, LinkedIn and Glassdoor comes back under
+different ids. Two passes find the copies:
+
+1. Jobs with the same normalized (title, company, location) are duplicates
+   unless both have descriptions that are clearly different.
+2. MinHash signatures of 5-word description shingles are bucketed with LSH
+   per location and first word of the company, so reworded titles ("Sr. PM"
+   vs "Senior Product Manager") or company names ("Uber" vs "Uber
+   Technologies") with near-identical descriptions are caught without
+   comparing every pair.
+
+Only jobs from different sites are merged: two ids from the same board are
+separate requisitions even when their text is identical, so a group never
+holds two different postings from one site. Each group of copies is merged
+into one record that keeps the most complete fields and lists every source
+in `sources`. Within a group or bucket a job is only compared with open
+candidates that have no other posting from its site, and with at most
+MAX_CANDIDATES of those, so both passes stay linear in the number of jobs even
+when one board returns thousands of identical boilerplate postings.
+"""
+
+import re
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from company_index import normalize_company
+
+SHINGLE_WORDS = 5
+MAX_DESCRIPTION_WORDS = 2000  # Long descriptions are compared on their first N words
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 similarity usually share a bucket
+KEY_MATCH_SIMILARITY = 0.5  # Same title/company/location: only very different descriptions keep them apart
+DESCRIPTION_MATCH_SIMILARITY = 0.8  # Different titles: descriptions must be near-identical
+MAX_CANDIDATES = 20  # Open candidates a job is compared with per group/bucket
+
+_WORD = re.compile(r"\w+")
+_TITLE_ABBREVIATIONS = {"sr": "senior", "jr": "junior", "mgr": "manager", "eng": "engineer", "dev": "developer"}
+_COUNTRY_PARTS = {"us", "usa", "united states", "united states of america"}
+
+def _words(text: Optional[str]) -> List[str]:
+    if not text or not isinstance(text, str):
+        return []
+    return _WORD.findall(text.casefold().replace("&", " and "))
+
+def normalize_title(title: Optional[str]) -> str:
+    return " ".join(_TITLE_ABBREVIATIONS.get(word, word) for word in _words(title))
+
+def normalize_location(location: Optional[str]) -> str:
+    """'San Francisco, CA, US' and 'San Francisco, CA' both become 'san francisco ca'"""
+    if not location or not isinstance(location, str):
+        return ""
+    parts = [" ".join(_words(part)) for part in location.split(",")]
+    parts = [part for part in parts if part and part not in _COUNTRY_PARTS]
+    return " ".join(parts[:2])
+
+def job_identity(job: Dict[str, Any]) -> Tuple[str, str, str]:
+    return normalize_title(job.get("title")), normalize_company(job.get("company")), normalize_location(job.get("location"))
+
+class MinHasher:
+    """MinHash signatures over word shingles, computed for many texts at once with numpy"""
+
+    BATCH_SHINGLES = 50000  # Shingles hashed per numpy batch (bounds the temporary matrix)
+
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, seed: int = 1):
+        import numpy as np
+        self._np = np
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: (a * x + b) mod 2^64, keep the high 32 bits; a must be odd
+        self._a = rng.integers(0, 2 ** 63, size=(num_permutations, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=(num_permutations, 1), dtype=np.uint64)
+
+    def _shingles(self, text: Optional[str]):
+        words = _words(text)[:MAX_DESCRIPTION_WORDS]
+        if len(words) < SHINGLE_WORDS:
+            return None
+        np = self._np
+        # Hash each word once, then combine neighbouring word hashes into shingle hashes
+        # instead of building every shingle string (uint64 wraparound is intended).
+        # hash() is salted per process, which is fine: signatures are only compared within one run
+        word_hashes = np.fromiter(map(hash, words), dtype=np.int64, count=len(words)).view(np.uint64)
+        count = len(words) - SHINGLE_WORDS + 1
+        shingles = word_hashes[:count].copy()
+        for offset in range(1, SHINGLE_WORDS):
+            shingles = shingles * np.uint64(1000003) + word_hashes[offset:offset + count]
+        return np.unique(shingles)
+
+    def signatures(self, texts: List[Optional[str]]) -> list:
+        """One signature per text (None for texts too short to shingle)"""
+        np = self._np
+        shingle_sets = [self._shingles(text) for text in texts]
+        signatures = [None] * len(texts)
+
+        batch: List[int] = []
+        batch_size = 0
+        pending = [i for i, shingles in enumerate(shingle_sets) if shingles is not None]
+        for position, i in enumerate(pending):
+            batch.append(i)
+            batch_size += len(shingle_sets[i])
+            if batch_size < self.BATCH_SHINGLES and position < len(pending) - 1:
+                continue
+            lengths = [len(shingle_sets[j]) for j in batch]
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            hashed = (self._a * np.concatenate([shingle_sets[j] for j in batch]) + self._b) >> np.uint64(32)
+            minimums = np.ascontiguousarray(np.minimum.reduceat(hashed, offsets, axis=1).T)
+            for row, j in enumerate(batch):
+                signatures[j] = minimums[row]
+            batch, batch_size = [], 0
+        return signatures
+
+def estimated_similarity(sig_a, sig_b) -> float:
+    return float((sig_a == sig_b).mean())
+
+def job_sources(job: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The postings a job stands for: its `sources` if it was merged before, else the job itself"""
+    sources = job.get("sources")
+    if isinstance(sources, list):
+        # Jobs can come from clients (/deduplicate-jobs), so ignore entries that aren't objects
+        valid = [source for source in sources if isinstance(source, dict)]
+        if valid:
+            return valid
+    return [{"site": job.get("site"), "job_url": job.get("job_url"), "id": job.get("id")}]
+
+def _site_postings(job: Dict[str, Any]) -> Optional[Dict[str, set]]:
+    """site -> posting ids of a job, or None when a source lacks a site or id (it is then never merged)"""
+    postings: Dict[str, set] = {}
+    for source in job_sources(job):
+        site, posting = source.get("site"), source.get("id") or source.get("job_url")
+        if not site or posting is None:
+            return None
+        postings.setdefault(str(site), set()).add(str(posting))
+    return postings
+
+class _DisjointSet:
+    """Union-find over jobs that only joins groups whose sites don't overlap"""
+
+    def __init__(self, postings: List[Optional[Dict[str, set]]]):
+        self.parent = list(range(len(postings)))
+        self.postings = postings  # Per root: site -> posting ids in the group
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def can_union(self, i: int, j: int) -> bool:
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i == root_j:
+            return False
+        postings_i, postings_j = self.postings[root_i], self.postings[root_j]
+        if postings_i is None or postings_j is None:
+            return False
+        # A site may appear on both sides only for the very same posting
+        return all(postings_i[site] == postings_j[site] for site in postings_i.keys() & postings_j.keys())
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            # Keep the earlier job as the root so groups stay in result order
+            root, child = min(root_i, root_j), max(root_i, root_j)
+            self.parent[child] = root
+            for site, ids in self.postings[child].items():
+                self.postings[root].setdefault(site, set()).update(ids)
+            self.postings[child] = None
+
+class _OpenGroups:
+    """Merge candidates within one group/bucket, filed by site so a job skips groups it can't join
+
+    A group's posting ids for a site never change once set, so a group either
+    still lacks a site or is closed for good to every other posting from it.
+    """
+
+    def __init__(self, groups: _DisjointSet):
+        self.groups = groups
+        self.candidates: List[int] = []
+        self.lacking: Dict[str, deque] = {}  # site -> candidates whose group had no posting from it
+        self.with_posting: Dict[Tuple[str, frozenset], List[int]] = {}  # (site, ids) -> candidates holding exactly those ids
+
+    def _postings(self, i: int) -> Dict[str, set]:
+        return self.groups.postings[self.groups.find(i)]
+
+    def _lacking(self, site: str) -> deque:
+        if site not in self.lacking:
+            self.lacking[site] = deque()
+            for candidate in self.candidates:
+                self._file(candidate, site)
+        return self.lacking[site]
+
+    def _file(self, candidate: int, site: str):
+        ids = self._postings(candidate).get(site)
+        if ids is None:
+            self.lacking[site].append(candidate)
+        else:
+            self.with_posting.setdefault((site, frozenset(ids)), []).append(candidate)
+
+    def matches(self, i: int):
+        """Up to MAX_CANDIDATES candidates with no other posting from i's first site, oldest first"""
+        postings = self._postings(i)
+        site = min(postings)
+        lacking = self._lacking(site)
+        # Groups that picked up this site since they were filed move to their posting's list
+        while lacking and site in self._postings(lacking[0]):
+            self._file(lacking.popleft(), site)
+        scanned = 0
+        for candidates in (self.with_posting.get((site, frozenset(postings[site])), ()), lacking):
+            for candidate in candidates:
+                if scanned == MAX_CANDIDATES:
+                    return
+                scanned += 1
+                yield candidate
+
+    def add(self, i: int):
+        self.candidates.append(i)
+        for site in self.lacking:
+            self._file(i, site)
+        for site in self._postings(i):
+            self._lacking(site)  # Start tracking the site; this also files i under its posting
+
+def _filled_fields(job: Dict[str, Any]) -> int:
+    return sum(1 for value in job.values() if value not in (None, ""))
+
+def merge_duplicates(group: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One record for a group of copies: the most complete copy, gaps filled from the others"""
+    primary = max(group, key=_filled_fields)  # max() keeps the first on ties
+    merged = dict(primary)
+    for job in group:
+        for key, value in job.items():
+            if merged.get(key) in (None, "") and value not in (None, ""):
+                merged[key] = value
+
+    # Records merged earlier (e.g. in a saved search's stored set) bring their own sources along
+    sources = {}
+    for job in group:
+        for source in job_sources(job):
+            sources.setdefault((str(source.get("site")), str(source.get("id")), str(source.get("job_url"))), source)
+    merged["sources"] = list(sources.values())
+    merged["duplicate_count"] = len(merged["sources"]) - 1
+    return merged
+
+def deduplicate_jobs(jobs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Collapse duplicate postings; returns (deduplicated jobs, number of jobs collapsed)"""
+    if len(jobs) < 2:
+        return jobs, 0
+
+    hasher = MinHasher()
+    identities = [job_identity(job) for job in jobs]
+    # Pass 2 compares jobs whose companies share a first word at the same location
+    places = [(company.split(" ", 1)[0], location) for _, company, location in identities]
+
+    # A job that shares its place with nobody else can't be a duplicate and never needs a signature
+    place_counts: Dict[Tuple[str, str], int] = {}
+    for place in places:
+        place_counts[place] = place_counts.get(place, 0) + 1
+    signatures = hasher.signatures([
+        job.get("description") if place_counts[place] > 1 else None
+        for job, place in zip(jobs, places)
+    ])
+    groups = _DisjointSet([_site_postings(job) for job in jobs])
+
+    def similar(i: int, j: int, threshold: float) -> bool:
+        if signatures[i] is None or signatures[j] is None:
+            return threshold <= KEY_MATCH_SIMILARITY  # Nothing to compare, trust the key
+        return estimated_similarity(signatures[i], signatures[j]) >= threshold
+
+    def merge_within(members: List[int], threshold: float):
+        """Join each job to the first open candidate it may merge with, or open a new one"""
+        candidates = _OpenGroups(groups)
+        open_roots = set()
+        for i in members:
+            root = groups.find(i)
+            # Sources without a site or id are never merged; a group already open here needs no second entry
+            if not groups.postings[root] or root in open_roots:
+                continue
+            match = next((j for j in candidates.matches(i) if groups.can_union(j, i) and similar(j, i, threshold)), None)
+            if match is None:
+                candidates.add(i)
+            else:
+                groups.union(match, i)
+            open_roots.add(groups.find(i))
+
+    # Pass 1: same normalized title, company and location
+    by_identity: Dict[Tuple[str, str, str], List[int]] = {}
+    for i, identity in enumerate(identities):
+        if identity[0] and identity[1]:
+            by_identity.setdefault(identity, []).append(i)
+    for members in by_identity.values():
+        merge_within(members, KEY_MATCH_SIMILARITY)
+
+    # Pass 2: near-identical descriptions at the same place, found via LSH buckets
+    rows_per_band = NUM_PERMUTATIONS // LSH_BANDS
+    buckets: Dict[tuple, List[int]] = {}
+    for i, signature in enumerate(signatures):
+        if signature is None or not places[i][0]:
+            continue
+        for band in range(LSH_BANDS):
+            band_hash = signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes()
+            buckets.setdefault((places[i], band, band_hash), []).append(i)
+    for members in buckets.values():
+        if len(members) > 1:
+            merge_within(members, DESCRIPTION_MATCH_SIMILARITY)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(jobs)):
+        clusters.setdefault(groups.find(i), []).append(i)
+
+    deduplicated = []
+    for root in sorted(clusters):
+        members = clusters[root]
+        if len(members) == 1:
+            deduplicated.append(jobs[members[0]])
+        else:
+            deduplicated.append(merge_duplicates([jobs[i] for i in members]))
+    return deduplicated, len(jobs) - len(deduplicated)
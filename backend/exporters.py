@@ -0,0 +1,191 @@
+"""
+Streaming CSV / Parquet / Excel export of job lists.
+
+Each writer turns a list of job dicts into an iterator of byte chunks, writing a
+batch of rows at a time, so the export is never held in memory as a whole.
+Parquet needs pyarrow and Excel needs openpyxl; both are imported only when
+that format is requested.
+"""
+
+import csv
+import io
+import json
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional
+
+EXPORT_FORMATS = {
+    "csv": {"media_type": "text/csv", "extension": "csv"},
+    "parquet": {"media_type": "application/vnd.apache.parquet", "extension": "parquet"},
+    "xlsx": {"media_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "extension": "xlsx"},
+}
+
+BATCH_SIZE = 500  # Rows written per chunk
+EXCEL_MAX_CELL_LENGTH = 32767
+
+# Spreadsheet apps run cells starting with these as formulas; scraped text must never be one
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+class ExportError(Exception):
+    """Export request that can't be served (unknown columns, missing optional dependency)"""
+
+def export_columns(jobs: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> List[str]:
+    """Requested columns (validated), or every column in order of first appearance"""
+    available: Dict[str, None] = {}
+    for job in jobs:
+        for key in job:
+            available.setdefault(key, None)
+
+    if not columns:
+        return list(available)
+    unknown = [column for column in columns if column not in available]
+    if unknown and jobs:
+        raise ExportError(f"Unknown columns: {unknown}. Available: {list(available)}")
+    return columns
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    # Nested values such as a merged job's `sources` are written as JSON
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+def _is_formula_like(value: Any) -> bool:
+    # Numbers are written as numbers, so only text can smuggle in a formula
+    return isinstance(value, str) and value.startswith(FORMULA_PREFIXES)
+
+def _csv_value(value: Any) -> str:
+    if value is None:
+        return ""
+    text = _text(value)
+    # A leading apostrophe makes Excel and Sheets show the text instead of evaluating it
+    return f"'{text}" if _is_formula_like(text) and not isinstance(value, (int, float)) else text
+
+def stream_csv(jobs: List[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([_csv_value(column) for column in columns])
+    for start in range(0, len(jobs), BATCH_SIZE):
+        for job in jobs[start:start + BATCH_SIZE]:
+            writer.writerow([_csv_value(job.get(column)) for column in columns])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _parquet_schema(jobs: List[Dict[str, Any]], columns: List[str]):
+    import pyarrow as pa
+
+    fields = []
+    for column in columns:
+        values = [job.get(column) for job in jobs if job.get(column) is not None]
+        if values and all(isinstance(v, bool) for v in values):
+            arrow_type = pa.bool_()
+        elif values and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+            arrow_type = pa.int64()
+        elif values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+def stream_parquet(jobs: List[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export needs pyarrow. Install it with: pip install pyarrow")
+
+    schema = _parquet_schema(jobs, columns)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for start in range(0, len(jobs), BATCH_SIZE):
+            batch = jobs[start:start + BATCH_SIZE]
+            arrays = {}
+            for field in schema:
+                values = [job.get(field.name) for job in batch]
+                if pa.types.is_string(field.type):
+                    values = [_text(value) for value in values]
+                arrays[field.name] = pa.array(values, type=field.type)
+            writer.write_table(pa.table(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+def _excel_value(sheet, value: Any) -> Any:
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = ILLEGAL_CHARACTERS_RE.sub("", _text(value))[:EXCEL_MAX_CELL_LENGTH]
+    if not _is_formula_like(text):
+        return text
+    # openpyxl turns text starting with '=' into a formula; store it as a plain string instead
+    cell = WriteOnlyCell(sheet, value=text)
+    cell.data_type = "s"
+    return cell
+
+def stream_xlsx(jobs: List[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportError("Excel export needs openpyxl. Install it with: pip install openpyxl")
+
+    # Write-only mode spools rows to disk as they are appended; the finished file
+    # is then streamed back from disk in chunks
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Jobs")
+    sheet.append([_excel_value(sheet, column) for column in columns])
+    for job in jobs:
+        sheet.append([_excel_value(sheet, job.get(column)) for column in columns])
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+EXPORT_WRITERS = {
+    "csv": stream_csv,
+    "parquet": stream_parquet,
+    "xlsx": stream_xlsx,
+}
+
+def stream_export(jobs: List[Dict[str, Any]], export_format: str, columns: Optional[List[str]] = None) -> Iterator[bytes]:
+    """
+    Byte chunks of the jobs in the given format. Columns and optional dependencies
+    are checked before the first chunk, so errors surface before streaming starts.
+    """
+    if export_format not in EXPORT_WRITERS:
+        raise ExportError(f"Unsupported format '{export_format}'. Use one of: {list(EXPORT_WRITERS)}")
+    columns = export_columns(jobs, columns)
+    chunks = EXPORT_WRITERS[export_format](jobs, columns)
+    first = next(chunks, b"")
+
+    def stream():
+        yield first
+        yield from chunks
+    return stream()
@@ -1,36 +1,96 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-import pandas as pd
-from jobspy import scrape_jobs
-import uvicorn
+from typing import List, Literal, Optional, Dict, Any
+from contextlib import asynccontextmanager
 from datetime import datetime
 import re
 import os
 from dotenv import load_dotenv
 import json
 import asyncio
-from openai import OpenAI
+import hashlib
+import functools
+from shared_state import get_async_store, get_shared_store, make_cache_key, get_or_compute, acquire_rate_budget
+from scrape_scheduler import schedule_scrape, scrape_queue_status, install_block_detection, SITE_POLICIES
+from company_index import get_company_index
+from dedup import deduplicate_jobs
+from exporters import EXPORT_FORMATS, ExportError, stream_export
+from saved_searches import (
+    SavedSearchScheduler, create_saved_search, delete_saved_search, find_saved_search_for,
+    get_saved_results, get_saved_search, get_saved_status, list_saved_searches
+)
 
-# Load environment variables
+# Load environment variables (cheap, and the settings below are read at import time)
 load_dotenv()
 
-# Initialize OpenAI client
-openai_client = None
+# pandas, jobspy and openai are imported on first use (or by the startup warm-up) so the
+# process can bind its port and answer /health and /supported-* without loading them
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-nano")
 
+# Multi-worker settings (cache, locks and budgets are shared through SHARED_STORE_URL)
+JOBSPY_WORKERS = int(os.getenv("JOBSPY_WORKERS", "1"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "900"))  # Seconds, 0 disables caching
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))  # Requests per minute per API key, 0 = unlimited
+
 if OPENAI_API_KEY:
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    print("✅ OpenAI client initialized for AI filtering")
+    print("✅ OpenAI API key found, AI filtering is available")
 else:
     print("⚠️ OpenAI API key not found. AI filtering will not be available.")
 
+# Set once the startup warm-up has loaded the heavy libraries; reported by /ready
+app_ready = asyncio.Event()
+WARM_UP_MAX_RETRY_DELAY = 30  # Seconds between warm-up retries, at most
+
+def scrape_jobs(**kwargs):
+    """JobSpy's scrape_jobs, imported on first use"""
+    from jobspy import scrape_jobs as jobspy_scrape_jobs
+    return jobspy_scrape_jobs(**kwargs)
+
+@functools.lru_cache(maxsize=32)
+def get_openai_client(api_key: str):
+    """One OpenAI client per API key, created on first use and reused across requests"""
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+def warm_up():
+    """Import the heavy libraries and open the shared store ahead of the first request"""
+    import pandas
+    import jobspy
+    import openai
+    install_block_detection()
+    get_shared_store().get("warmup")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async def warm_up_in_background():
+        started = datetime.now()
+        delay = 1
+        while True:
+            try:
+                await asyncio.to_thread(warm_up)
+                break
+            except Exception as e:
+                # e.g. Redis not reachable yet at boot; /ready stays 503 until a retry succeeds
+                print(f"❌ Warm-up failed: {e}. Retrying in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, WARM_UP_MAX_RETRY_DELAY)
+        print(f"✅ Ready in {(datetime.now() - started).total_seconds():.1f}s")
+        app_ready.set()
+    
+    warm_up_task = asyncio.create_task(warm_up_in_background())
+    saved_search_scheduler.start()
+    yield
+    warm_up_task.cancel()
+    await saved_search_scheduler.stop()
+
 app = FastAPI(
     title="JobSpy API with AI Filtering",
     description="Job scraping API using JobSpy library with OpenAI-powered intelligent filtering",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow frontend access
@@ -46,6 +106,9 @@ class JobSearchRequest(BaseModel):
     site_name: Optional[List[str]] = ["indeed"]  # Default to Indeed only
     search_term: str = "Product Manager"  # Job title/role only
     company_filter: Optional[str] = None  # Company to filter for (None = no filter)
+    company_filters: Optional[List[str]] = None  # Several companies at once (combined with company_filter)
+    company_match: Literal["exact", "prefix", "fuzzy"] = "prefix"  # How company names are compared
+    deduplicate: bool = True  # Merge the same posting found on several sites into one job
     location: Optional[str] = "USA"  # Match your Jupyter example
     distance: Optional[int] = 50
     job_type: Optional[str] = None  # fulltime, parttime, internship, contract
@@ -65,6 +128,44 @@ class JobSearchResponse(BaseModel):
     jobs: List[dict]
     search_params: dict
     timestamp: str
+    duplicates_collapsed: Optional[int] = None  # Cross-site copies merged into other jobs
+
+# Deduplication Models
+class DeduplicateRequest(BaseModel):
+    jobs: List[Dict[str, Any]]  # Jobs to deduplicate, e.g. the "jobs" of a /search-jobs response
+
+class DeduplicateResponse(BaseModel):
+    success: bool
+    message: str
+    original_count: int
+    job_count: int
+    duplicates_collapsed: int
+    jobs: List[Dict[str, Any]]
+    timestamp: str
+
+# Saved Search Models
+class SavedSearchRequest(JobSearchRequest):
+    name: str  # Display name, e.g. "Uber PMs"
+    refresh_minutes: int = 60  # How often the background scheduler refreshes it
+    refresh_hours_old: Optional[int] = None  # Minimum hours_old window for incremental refreshes
+
+class SavedSearchInfo(BaseModel):
+    id: str
+    name: str
+    request: Dict[str, Any]
+    refresh_minutes: int
+    refresh_hours_old: Optional[int] = None
+    created_at: str
+    job_count: int = 0
+    last_refreshed: Optional[str] = None
+    last_new_jobs: Optional[int] = None
+
+# Export Models
+class ExportRequest(BaseModel):
+    search: Optional[JobSearchRequest] = None  # Export the results of this search (cached results are reused)
+    saved_search_id: Optional[str] = None  # Or export a saved search's stored results
+    format: Literal["csv", "parquet", "xlsx"] = "csv"
+    columns: Optional[List[str]] = None  # Columns to include, in order (None = all)
 
 # AI Filtering Models
 class AIFilterRequest(BaseModel):
@@ -98,11 +199,16 @@ async def root():
             "/ai-filter-jobs - AI-powered job analysis and filtering",
             "/supported-sites - Get supported job sites",
             "/supported-countries - Get supported countries",
-            "/health - Health check"
+            "/saved-searches - Saved searches refreshed in the background",
+            "/export - Download search results as CSV, Parquet or Excel",
+            "/deduplicate-jobs - Merge the same posting found on several job sites",
+            "/scrape-queue - Per-site scrape queue, backoff and your queue positions",
+            "/health - Liveness check",
+            "/ready - Readiness check (libraries loaded)"
         ],
         "ai_features": {
-            "available": openai_client is not None,
-            "model": OPENAI_MODEL if openai_client else "Not configured"
+            "available": OPENAI_API_KEY is not None,
+            "model": OPENAI_MODEL if OPENAI_API_KEY else "Not configured"
         }
     }
 
@@ -150,115 +256,198 @@ async def get_supported_countries():
         "note": "These countries are supported for Indeed and Glassdoor. LinkedIn searches globally, ZipRecruiter supports US/Canada only."
     }
 
-def filter_jobs_by_company(jobs_df, company_filter):
-    """A simplified, stricter filter for companies."""
-    if not company_filter or jobs_df is None or jobs_df.empty:
-        return jobs_df
+def requested_companies(request: JobSearchRequest) -> List[str]:
+    """All companies a request filters for (company_filter plus company_filters)"""
+    companies = [request.company_filter] + (request.company_filters or [])
+    return [company.strip() for company in companies if company and company.strip()]
 
-    company_filter_clean = company_filter.lower().strip()
+def filter_jobs_by_company(jobs_list: List[dict], companies: List[str], match: str = "prefix", index_key: Optional[str] = None) -> List[dict]:
+    """Keep jobs whose normalized company matches any of the given companies"""
+    if not companies or not jobs_list:
+        return jobs_list
     
-    print("--- Simplified Company Filtering ---")
-    print(f"🎯 Filtering for companies that start with: '{company_filter_clean}'")
-
-    # This prevents errors if the 'company' column contains non-string data
-    jobs_df['company'] = jobs_df['company'].astype(str)
-
-    mask = jobs_df['company'].str.lower().str.strip().str.startswith(company_filter_clean, na=False)
+    print("--- Company Filtering ---")
+    print(f"🎯 Filtering for companies ({match} match): {companies}")
     
-    filtered_df = jobs_df[mask].copy()
+    index = get_company_index(jobs_list, index_key)
+    filtered_jobs = [jobs_list[row] for row in index.rows(companies, match)]
     
-    print(f"📊 Before: {len(jobs_df)} jobs. After: {len(filtered_df)} jobs.")
+    print(f"📊 Before: {len(jobs_list)} jobs. After: {len(filtered_jobs)} jobs.")
     print("---------------------------------")
-    return filtered_df
+    return filtered_jobs
 
-@app.post("/search-jobs", response_model=JobSearchResponse)
-async def search_jobs(request: JobSearchRequest):
-    """Search for jobs using JobSpy"""
-    try:
-        # Prepare search term - append company for better search results ONLY if company filter is provided
-        actual_search_term = request.search_term
-        if request.company_filter and request.company_filter.strip():
-            actual_search_term = f"{request.search_term} {request.company_filter}".strip()
-            print(f"🔍 Company filter provided: '{request.company_filter}' - will filter results")
-        else:
-            print("🔍 No company filter - will show all companies")
-        
-        # Prepare parameters for JobSpy
-        search_params = {
-            "site_name": request.site_name,
-            "search_term": actual_search_term,  # Use combined search term
-            "location": request.location,
-            "distance": request.distance,
-            "job_type": request.job_type,
-            "is_remote": request.is_remote,
-            "results_wanted": request.results_wanted,
-            "hours_old": request.hours_old,
-            "country_indeed": request.country_indeed,
-            "easy_apply": request.easy_apply,
-            "description_format": request.description_format,
-            "offset": request.offset,
-            "verbose": request.verbose
-        }
+def dataframe_to_records(jobs_df) -> List[dict]:
+    """Convert a JobSpy DataFrame to a list of dicts with NaN values replaced by None"""
+    if jobs_df is None or jobs_df.empty:
+        return []
+    
+    import pandas as pd
+    jobs_list = jobs_df.to_dict('records')
+    for job in jobs_list:
+        for key, value in job.items():
+            if pd.isna(value):
+                job[key] = None
+    return jobs_list
+
+def get_client_id(http_request: Request) -> str:
+    """Identify the caller for fair scrape queueing (X-Client-Id header, else client IP)"""
+    client_id = http_request.headers.get("X-Client-Id")
+    if client_id:
+        return client_id
+    return http_request.client.host if http_request.client else "anonymous"
+
+def search_cache_key(search_params: dict, deduplicate: bool = False) -> str:
+    """Shared cache key for a scrape (deduplicated results are cached separately)"""
+    return make_cache_key("search", {**search_params, "deduplicate": True} if deduplicate else search_params)
+
+async def scrape_jobs_shared(search_params: dict, client_id: str, deduplicate: bool = False, use_cache: bool = True) -> dict:
+    """
+    Scrape jobs once per unique parameter set across all workers, serving repeats from the shared cache
+    (use_cache=False always scrapes). Returns {"jobs": [...], "duplicates_collapsed": n}; cross-site
+    duplicates are merged when deduplicate is set and more than one site was searched.
+    """
+    store = get_async_store()
+    cache_key = search_cache_key(search_params, deduplicate)
+    
+    async def run_scrape():
+        print(f"🌐 {'Cache miss' if use_cache else 'Cache bypassed'}, scraping: {cache_key}")
+        # Imports jobspy if the warm-up hasn't yet, so keep it off the event loop
+        await asyncio.to_thread(install_block_detection)
         
-        # Remove None values
-        search_params = {k: v for k, v in search_params.items() if v is not None}
+        # One JobSpy call per site so each board's politeness limits apply independently
+        # (results_wanted is already per site in JobSpy, so splitting doesn't change results)
+        sites = search_params.get("site_name") or list(SITE_POLICIES)
+        site_frames = await asyncio.gather(*[
+            schedule_scrape(site, client_id, functools.partial(scrape_jobs, **{**search_params, "site_name": [site]}))
+            for site in sites
+        ])
+        jobs_list = [job for jobs_df in site_frames for job in dataframe_to_records(jobs_df)]
         
-        # Debug: Print exact parameters being sent to JobSpy
-        print(f"🔍 Original search term: '{request.search_term}'")
-        print(f"🏢 Company filter: '{request.company_filter}'")
-        print(f"🔍 Actual search term sent to JobSpy: '{actual_search_term}'")
-        print(f"📋 JobSpy Parameters: {search_params}")
+        duplicates_collapsed = 0
+        if deduplicate and len(sites) > 1:
+            jobs_list, duplicates_collapsed = await asyncio.to_thread(deduplicate_jobs, jobs_list)
+            print(f"🧬 Merged {duplicates_collapsed} cross-site duplicates")
+        return {"jobs": jobs_list, "duplicates_collapsed": duplicates_collapsed}
+    
+    if not use_cache:
+        return await run_scrape()
+    return await get_or_compute(store, cache_key, run_scrape, ttl=SEARCH_CACHE_TTL)
+
+async def acquire_openai_budget(client):
+    """Wait for a slot in the per-minute OpenAI budget shared by all workers using this API key"""
+    key_id = hashlib.sha256(str(client.api_key).encode()).hexdigest()[:16]
+    await acquire_rate_budget(get_async_store(), f"openai:{key_id}", OPENAI_RPM_LIMIT, 60)
+
+def build_search_params(request: JobSearchRequest) -> dict:
+    """Translate a JobSearchRequest into JobSpy parameters"""
+    # Prepare search term - append company for better search results ONLY if company filter is provided
+    actual_search_term = request.search_term
+    if request.company_filter and request.company_filter.strip():
+        actual_search_term = f"{request.search_term} {request.company_filter}".strip()
+        print(f"🔍 Company filter provided: '{request.company_filter}' - will filter results")
+    else:
+        print("🔍 No company filter - will show all companies")
+    
+    # Prepare parameters for JobSpy
+    search_params = {
+        "site_name": request.site_name,
+        "search_term": actual_search_term,  # Use combined search term
+        "location": request.location,
+        "distance": request.distance,
+        "job_type": request.job_type,
+        "is_remote": request.is_remote,
+        "results_wanted": request.results_wanted,
+        "hours_old": request.hours_old,
+        "country_indeed": request.country_indeed,
+        "easy_apply": request.easy_apply,
+        "description_format": request.description_format,
+        "offset": request.offset,
+        "verbose": request.verbose
+    }
+    
+    # Remove None values
+    search_params = {k: v for k, v in search_params.items() if v is not None}
+    
+    # Debug: Print exact parameters being sent to JobSpy
+    print(f"🔍 Original search term: '{request.search_term}'")
+    print(f"🏢 Company filter: {requested_companies(request) or None}")
+    print(f"🔍 Actual search term sent to JobSpy: '{actual_search_term}'")
+    print(f"📋 JobSpy Parameters: {search_params}")
+    return search_params
+
+async def scrape_and_filter(request: JobSearchRequest, search_params: dict, client_id: str, use_cache: bool = True):
+    """Run the scrape for a request and apply its company filter; returns (jobs, duplicates collapsed)"""
+    # Call JobSpy (shared cache + single-flight so workers never duplicate a scrape)
+    scrape_result = await scrape_jobs_shared(search_params, client_id, request.deduplicate, use_cache)
+    jobs_list = scrape_result["jobs"]
+    
+    # Debug: Print initial result info
+    if jobs_list:
+        print(f"✅ JobSpy returned {len(jobs_list)} jobs initially")
         
-        # Call JobSpy
-        jobs_df = scrape_jobs(**search_params)
+        # Apply company filter if specified
+        companies = requested_companies(request)
+        if companies:
+            index_key = search_cache_key(search_params, request.deduplicate) if use_cache else None
+            jobs_list = filter_jobs_by_company(jobs_list, companies, request.company_match, index_key)
         
-        # Debug: Print initial result info
-        if jobs_df is not None and not jobs_df.empty:
-            print(f"✅ JobSpy returned {len(jobs_df)} jobs initially")
-            
-            # Apply company filter if specified
-            if request.company_filter and request.company_filter.strip():
-                jobs_df = filter_jobs_by_company(jobs_df, request.company_filter)
-            
-            print(f"📊 Final job count after filtering: {len(jobs_df)}")
-            print(f"📊 Columns: {list(jobs_df.columns)}")
-        else:
-            print("❌ JobSpy returned no results")
+        print(f"📊 Final job count after filtering: {len(jobs_list)}")
+    else:
+        print("❌ JobSpy returned no results")
+    return jobs_list, scrape_result["duplicates_collapsed"]
+
+async def find_jobs(request: JobSearchRequest, client_id: str):
+    """
+    Jobs for a search request, from a saved search, the shared cache, or a fresh scrape.
+    Returns (jobs, search params, duplicates collapsed or None when served from a saved search).
+    """
+    search_params = build_search_params(request)
+    
+    # Serve from a saved search's pre-warmed results when one covers this exact request
+    saved_search_id = await find_saved_search_for(request.model_dump())
+    saved_results = await get_saved_results(saved_search_id) if saved_search_id else None
+    if saved_results:
+        print(f"⚡ Serving {len(saved_results['jobs'])} pre-warmed jobs from saved search {saved_search_id}")
+        search_params["saved_search_id"] = saved_search_id
+        return saved_results["jobs"], search_params, None
+    
+    jobs_list, duplicates_collapsed = await scrape_and_filter(request, search_params, client_id)
+    return jobs_list, search_params, duplicates_collapsed
+
+@app.post("/search-jobs", response_model=JobSearchResponse)
+async def search_jobs(request: JobSearchRequest, http_request: Request):
+    """Search for jobs using JobSpy"""
+    try:
+        jobs_list, search_params, duplicates_collapsed = await find_jobs(request, get_client_id(http_request))
         
-        # Convert DataFrame to list of dictionaries
-        if jobs_df is not None and not jobs_df.empty:
-            jobs_list = jobs_df.to_dict('records')
-            
-            # Clean up any NaN values
-            for job in jobs_list:
-                for key, value in job.items():
-                    if pd.isna(value):
-                        job[key] = None
-            
+        if jobs_list:
             # Add search info to response
             filter_info = ""
-            if request.company_filter:
-                filter_info = f" (filtered for company: {request.company_filter})"
+            if requested_companies(request):
+                filter_info = f" (filtered for company: {', '.join(requested_companies(request))})"
+            if duplicates_collapsed:
+                filter_info += f", {duplicates_collapsed} cross-site duplicates merged"
             
             return JobSearchResponse(
                 success=True,
                 message=f"Successfully found {len(jobs_list)} jobs{filter_info}",
                 job_count=len(jobs_list),
                 jobs=jobs_list,
-                search_params={**search_params, "company_filter": request.company_filter},
-                timestamp=datetime.now().isoformat()
+                search_params={**search_params, "company_filter": request.company_filter, "company_filters": request.company_filters},
+                timestamp=datetime.now().isoformat(),
+                duplicates_collapsed=duplicates_collapsed
             )
         else:
             filter_info = ""
-            if request.company_filter:
-                filter_info = f" for company '{request.company_filter}'"
+            if requested_companies(request):
+                filter_info = f" for company '{', '.join(requested_companies(request))}'"
             
             return JobSearchResponse(
                 success=True,
                 message=f"No jobs found matching your criteria{filter_info}",
                 job_count=0,
                 jobs=[],
-                search_params={**search_params, "company_filter": request.company_filter},
+                search_params={**search_params, "company_filter": request.company_filter, "company_filters": request.company_filters},
                 timestamp=datetime.now().isoformat()
             )
             
@@ -268,6 +457,20 @@ async def search_jobs(request: JobSearchRequest):
             detail=f"Error scraping jobs: {str(e)}"
         )
 
+@app.post("/deduplicate-jobs", response_model=DeduplicateResponse)
+async def deduplicate_jobs_endpoint(request: DeduplicateRequest):
+    """Merge duplicate postings (e.g. the same job from Indeed and LinkedIn) in a list of jobs"""
+    jobs_list, duplicates_collapsed = await asyncio.to_thread(deduplicate_jobs, request.jobs)
+    return DeduplicateResponse(
+        success=True,
+        message=f"Merged {duplicates_collapsed} duplicates, {len(jobs_list)} unique jobs remain",
+        original_count=len(request.jobs),
+        job_count=len(jobs_list),
+        duplicates_collapsed=duplicates_collapsed,
+        jobs=jobs_list,
+        timestamp=datetime.now().isoformat()
+    )
+
 # AI Filtering Functions
 async def analyze_job_with_ai(job: Dict[str, Any], analysis_prompt: str, job_id: int, client) -> AIAnalysisResult:
     """Analyze a single job using OpenAI"""
@@ -311,6 +514,7 @@ async def analyze_job_with_ai(job: Dict[str, Any], analysis_prompt: str, job_id:
     """
     
     try:
+        await acquire_openai_budget(client)
         response = await asyncio.to_thread(
             client.chat.completions.create,
             model=OPENAI_MODEL,
@@ -365,6 +569,7 @@ async def filter_jobs_with_ai(analyzed_jobs: List[AIAnalysisResult], filter_crit
     """
     
     try:
+        await acquire_openai_budget(client)
         response = await asyncio.to_thread(
             client.chat.completions.create,
             model=OPENAI_MODEL,
@@ -412,9 +617,8 @@ async def ai_filter_jobs(request: AIFilterRequest, http_request: Request):
                 detail="OpenAI API key is required. Please provide it in the X-OpenAI-API-Key header or configure OPENAI_API_KEY in your environment."
             )
         
-        # Initialize OpenAI client with the provided API key
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
+        # Reuse the OpenAI client for this API key
+        client = get_openai_client(api_key)
         
         start_time = datetime.now()
         original_count = len(request.jobs)
@@ -501,10 +705,175 @@ async def ai_filter_jobs(request: AIFilterRequest, http_request: Request):
             detail=f"Error in AI filtering: {str(e)}"
         )
 
+# Saved Searches
+async def scrape_saved_search(request_params: dict, hours_old: int, client_id: str) -> List[dict]:
+    """Scrape callback for the saved search scheduler: the saved request with a narrower hours_old"""
+    request = JobSearchRequest(**{**request_params, "hours_old": hours_old})
+    # Always scrape: the small refresh window repeats, so the search cache would hand back the last refresh
+    jobs_list, _ = await scrape_and_filter(request, build_search_params(request), client_id, use_cache=False)
+    return jobs_list
+
+saved_search_scheduler = SavedSearchScheduler(scrape_saved_search)
+
+async def saved_search_info(definition: dict) -> SavedSearchInfo:
+    status = await get_saved_status(definition["id"])
+    return SavedSearchInfo(
+        **definition,
+        job_count=status["job_count"] if status else 0,
+        last_refreshed=datetime.fromtimestamp(status["refreshed_at"]).isoformat() if status else None,
+        last_new_jobs=status["last_new_jobs"] if status else None
+    )
+
+async def get_saved_search_or_404(search_id: str) -> dict:
+    definition = await get_saved_search(search_id)
+    if not definition:
+        raise HTTPException(status_code=404, detail=f"Saved search '{search_id}' not found")
+    return definition
+
+@app.post("/saved-searches", response_model=SavedSearchInfo)
+async def create_saved_search_endpoint(request: SavedSearchRequest):
+    """Save a search and start refreshing it in the background"""
+    if request.refresh_minutes < 1:
+        raise HTTPException(status_code=400, detail="refresh_minutes must be at least 1")
+    
+    request_params = JobSearchRequest(**request.model_dump()).model_dump()
+    if await find_saved_search_for(request_params):
+        raise HTTPException(status_code=409, detail="A saved search with these exact parameters already exists")
+    
+    definition = await create_saved_search(request.name, request_params, request.refresh_minutes, request.refresh_hours_old)
+    saved_search_scheduler.trigger(definition["id"], force=True)
+    print(f"💾 Saved search '{request.name}' created ({definition['id']}), refreshing every {request.refresh_minutes} min")
+    return await saved_search_info(definition)
+
+@app.get("/saved-searches")
+async def list_saved_searches_endpoint():
+    """List saved searches with their refresh status"""
+    definitions = await list_saved_searches()
+    return {"saved_searches": await asyncio.gather(*map(saved_search_info, definitions))}
+
+@app.get("/saved-searches/{search_id}/results", response_model=JobSearchResponse)
+async def get_saved_search_results(
+    search_id: str,
+    companies: Optional[List[str]] = Query(None),
+    company_match: Literal["exact", "prefix", "fuzzy"] = "prefix"
+):
+    """Stored results of a saved search, without scraping, optionally narrowed to some companies"""
+    definition = await get_saved_search_or_404(search_id)
+    results = await get_saved_results(search_id)
+    jobs = results["jobs"] if results else []
+    if companies and results:
+        # The index is built once per refresh of the stored set and reused by later filters
+        index_key = f"saved:{search_id}:{results['refreshed_at']}"
+        jobs = filter_jobs_by_company(jobs, companies, company_match, index_key)
+    
+    message = f"{len(jobs)} jobs from saved search '{definition['name']}'"
+    if not results:
+        message = f"Saved search '{definition['name']}' has not finished its first refresh yet"
+    
+    return JobSearchResponse(
+        success=True,
+        message=message,
+        job_count=len(jobs),
+        jobs=jobs,
+        search_params={**definition["request"], "saved_search_id": search_id},
+        timestamp=datetime.now().isoformat()
+    )
+
+@app.post("/saved-searches/{search_id}/refresh", response_model=SavedSearchInfo)
+async def refresh_saved_search_endpoint(search_id: str):
+    """Refresh a saved search now, in the background"""
+    definition = await get_saved_search_or_404(search_id)
+    saved_search_scheduler.trigger(search_id, force=True)
+    return await saved_search_info(definition)
+
+@app.delete("/saved-searches/{search_id}")
+async def delete_saved_search_endpoint(search_id: str):
+    """Delete a saved search and its stored results"""
+    await get_saved_search_or_404(search_id)
+    await delete_saved_search(search_id)
+    return {"success": True, "message": f"Saved search '{search_id}' deleted"}
+
+# Export
+async def export_response(jobs: List[dict], export_format: str, columns: Optional[List[str]], name: str) -> StreamingResponse:
+    """Stream jobs as a file download in the requested format"""
+    try:
+        # Runs the column checks and writes the first chunk off the event loop
+        chunks = await asyncio.to_thread(stream_export, jobs, export_format, columns)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    file_info = EXPORT_FORMATS[export_format]
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_info['extension']}"
+    print(f"📦 Exporting {len(jobs)} jobs as {export_format}: {filename}")
+    return StreamingResponse(
+        chunks,
+        media_type=file_info["media_type"],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.post("/export")
+async def export_jobs(request: ExportRequest, http_request: Request):
+    """Download a search result or a saved search's stored jobs as CSV, Parquet or Excel"""
+    if (request.search is None) == (request.saved_search_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'search' or 'saved_search_id'")
+    
+    if request.saved_search_id:
+        await get_saved_search_or_404(request.saved_search_id)
+        results = await get_saved_results(request.saved_search_id)
+        jobs = results["jobs"] if results else []
+        name = f"saved_search_{request.saved_search_id}"
+    else:
+        try:
+            jobs, _, _ = await find_jobs(request.search, get_client_id(http_request))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error scraping jobs: {str(e)}")
+        name = "jobs"
+    
+    return await export_response(jobs, request.format, request.columns, name)
+
+@app.get("/export")
+async def export_saved_search(
+    saved_search_id: str,
+    format: Literal["csv", "parquet", "xlsx"] = "csv",
+    columns: Optional[List[str]] = Query(None)
+):
+    """Download link form of /export for a saved search's stored jobs"""
+    return await export_jobs(ExportRequest(saved_search_id=saved_search_id, format=format, columns=columns), None)
+
+@app.get("/scrape-queue")
+async def get_scrape_queue(http_request: Request, client_id: Optional[str] = None):
+    """Per-site scrape queue status; positions are for the given client_id (defaults to the caller)"""
+    client_id = client_id or get_client_id(http_request)
+    return {
+        "client_id": client_id,
+        "sites": await scrape_queue_status(client_id),
+        "note": "Queue positions are tracked per worker process; slots, rate limits and backoff are shared",
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check: the process is up and serving requests"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: heavy libraries are loaded and searches will be served at full speed"""
+    if not app_ready.is_set():
+        raise HTTPException(status_code=503, detail="Starting up")
+    return {"status": "ready", "timestamp": datetime.now().isoformat()}
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    import uvicorn
+    if JOBSPY_WORKERS > 1:
+        # Workers need an import string; app_dir lets each worker import main.py from this folder
+        print(f"🚀 Starting {JOBSPY_WORKERS} workers (shared store: {os.getenv('SHARED_STORE_URL', 'sqlite default')})")
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=JOBSPY_WORKERS,
+            app_dir=os.path.dirname(os.path.abspath(__file__))
+        )
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,221 @@
+"""
+Saved searches with background incremental refresh.
+
+A saved search is a JobSearchRequest plus a refresh interval. The scheduler
+re-runs each one in the background with a small hours_old window covering only
+the time since its last refresh, merges the new postings into the stored result
+set, and /search-jobs serves matching requests straight from that set.
+
+Definitions and result sets live in the shared store, and refreshes take a
+shared lock, so with several workers each saved search is refreshed once.
+Each result set has a small status record next to it (refresh times, counts)
+so due checks and listings never load the stored jobs.
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dedup import deduplicate_jobs
+from shared_state import get_async_store, make_cache_key, renewed_lock
+
+SAVED_SEARCH_POLL_SECONDS = int(os.getenv("SAVED_SEARCH_POLL_SECONDS", "30"))
+REFRESH_LOCK_TTL = 900  # Seconds; renewed while the refresh runs, so only a crashed worker lets it expire
+
+INDEX_KEY = "saved_searches:index"
+
+# (request params, hours_old window, client id) -> jobs
+ScrapeFunc = Callable[[dict, int, str], Awaitable[List[dict]]]
+
+def match_key(request_params: dict) -> str:
+    """Key used to recognise a /search-jobs request that a saved search already covers"""
+    params = {k: v for k, v in request_params.items() if k != "verbose"}
+    return make_cache_key("saved_search_match", params)
+
+async def _update_index(update: Callable[[List[str]], List[str]]):
+    store = get_async_store()
+    token = uuid.uuid4().hex
+    while not await store.set(f"lock:{INDEX_KEY}", token, ttl=10, nx=True):
+        await asyncio.sleep(0.05)
+    try:
+        ids = await store.get_json(INDEX_KEY) or []
+        await store.set_json(INDEX_KEY, update(ids))
+    finally:
+        await store.delete_if_equals(f"lock:{INDEX_KEY}", token)
+
+async def get_saved_search(search_id: str) -> Optional[dict]:
+    return await get_async_store().get_json(f"saved_search:{search_id}")
+
+async def list_saved_searches() -> List[dict]:
+    ids = await get_async_store().get_json(INDEX_KEY) or []
+    definitions = await asyncio.gather(*map(get_saved_search, ids))
+    return [definition for definition in definitions if definition]
+
+async def create_saved_search(name: str, request_params: dict, refresh_minutes: int, refresh_hours_old: Optional[int]) -> dict:
+    store = get_async_store()
+    definition = {
+        "id": uuid.uuid4().hex[:12],
+        "name": name,
+        "request": request_params,
+        "refresh_minutes": refresh_minutes,
+        "refresh_hours_old": refresh_hours_old,
+        "created_at": datetime.now().isoformat()
+    }
+    await store.set_json(f"saved_search:{definition['id']}", definition)
+    await store.set(match_key(request_params), definition["id"])
+    await _update_index(lambda ids: ids + [definition["id"]])
+    return definition
+
+async def delete_saved_search(search_id: str) -> bool:
+    definition = await get_saved_search(search_id)
+    if not definition:
+        return False
+    store = get_async_store()
+    await store.delete_if_equals(match_key(definition["request"]), search_id)
+    await store.delete(f"saved_search:{search_id}")
+    await store.delete(f"saved_status:{search_id}")
+    await store.delete(f"saved_results:{search_id}")
+    await _update_index(lambda ids: [i for i in ids if i != search_id])
+    return True
+
+async def find_saved_search_for(request_params: dict) -> Optional[str]:
+    return await get_async_store().get(match_key(request_params))
+
+async def get_saved_results(search_id: str) -> Optional[dict]:
+    return await get_async_store().get_json(f"saved_results:{search_id}")
+
+async def get_saved_status(search_id: str) -> Optional[dict]:
+    """refreshed_at, full_refreshed_at, last_new_jobs and job_count of the stored results"""
+    return await get_async_store().get_json(f"saved_status:{search_id}")
+
+def job_key(job: dict) -> str:
+    return str(job.get("id") or job.get("job_url") or json.dumps(job, sort_keys=True, default=str))
+
+def merge_jobs(existing: List[dict], fresh: List[dict], max_age_hours: Optional[int]) -> List[dict]:
+    """Merge fresh postings over the stored set (newer copy wins) and drop ones past hours_old"""
+    merged = {job_key(job): job for job in existing}
+    for job in fresh:
+        merged[job_key(job)] = job
+
+    if max_age_hours:
+        cutoff = (datetime.now() - timedelta(hours=max_age_hours)).date().isoformat()
+        # date_posted is an ISO date string once it has been through the store; unknown dates are kept
+        merged = {k: job for k, job in merged.items() if not job.get("date_posted") or str(job["date_posted"]) >= cutoff}
+
+    return sorted(merged.values(), key=lambda job: str(job.get("date_posted") or ""), reverse=True)
+
+def refresh_window_hours(definition: dict, status: Optional[dict]) -> Optional[int]:
+    """hours_old for the next refresh, or None when a full refresh is needed"""
+    if not status:
+        return None
+    full_hours = definition["request"].get("hours_old")
+    since_last = (time.time() - status["refreshed_at"]) / 3600
+    # Cover the whole gap since the last refresh (plus an hour of overlap), so downtime never leaves holes
+    window = max(math.ceil(since_last) + 1, definition.get("refresh_hours_old") or 1)
+    if full_hours and window >= full_hours:
+        return None
+    return window
+
+def is_due(definition: dict, status: Optional[dict]) -> bool:
+    if not status:
+        return True
+    return time.time() - status["refreshed_at"] >= definition["refresh_minutes"] * 60
+
+async def refresh_saved_search(search_id: str, scrape: ScrapeFunc, force: bool = False) -> Optional[dict]:
+    """Refresh one saved search if it is due (or forced); returns the stored results, None if skipped"""
+    store = get_async_store()
+    lock_key = f"lock:saved_refresh:{search_id}"
+    token = uuid.uuid4().hex
+    if not await store.set(lock_key, token, ttl=REFRESH_LOCK_TTL, nx=True):
+        return None  # Another worker is already refreshing it
+
+    try:
+        async with renewed_lock(store, lock_key, token, REFRESH_LOCK_TTL):
+            # Re-read under the lock: another worker may have refreshed it since we checked
+            definition = await get_saved_search(search_id)
+            status = await get_saved_status(search_id)
+            if not definition or (not force and not is_due(definition, status)):
+                return None
+
+            window = refresh_window_hours(definition, status)
+            hours_old = window or definition["request"].get("hours_old")
+            print(f"🔄 Refreshing saved search '{definition['name']}' ({'full' if window is None else f'last {window}h'})")
+
+            fresh = await scrape(definition["request"], hours_old, f"saved-search:{search_id}")
+            # Only an incremental refresh needs the stored jobs
+            results = await get_saved_results(search_id) if window is not None else None
+            existing = results["jobs"] if results else []
+            existing_keys = {job_key(job) for job in existing}
+            new_jobs = sum(1 for job in fresh if job_key(job) not in existing_keys)
+            jobs = merge_jobs(existing, fresh, definition["request"].get("hours_old"))
+            if existing and definition["request"].get("deduplicate", True) and len(definition["request"].get("site_name") or [None, None]) > 1:
+                # A posting can reach the stored set from one site now and another site later
+                jobs, _ = await asyncio.to_thread(deduplicate_jobs, jobs)
+
+            now = time.time()
+            status = {
+                "refreshed_at": now,
+                "full_refreshed_at": now if window is None else status["full_refreshed_at"],
+                "last_new_jobs": new_jobs,
+                "job_count": len(jobs)
+            }
+            results = {"jobs": jobs, **status}
+            await store.set_json(f"saved_results:{search_id}", results)
+            await store.set_json(f"saved_status:{search_id}", status)
+            print(f"✅ Saved search '{definition['name']}' now has {len(jobs)} jobs")
+            return results
+    finally:
+        await store.delete_if_equals(lock_key, token)
+
+class SavedSearchScheduler:
+    """Background loop that refreshes due saved searches in this process"""
+
+    def __init__(self, scrape: ScrapeFunc):
+        self.scrape = scrape
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [t for t in [self._task, *self._refreshing.values()] if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._refreshing.clear()
+
+    def trigger(self, search_id: str, force: bool = False):
+        """Start a refresh in the background unless one is already running here"""
+        running = self._refreshing.get(search_id)
+        if running and not running.done():
+            return
+        task = asyncio.create_task(self._refresh(search_id, force))
+        self._refreshing[search_id] = task
+
+    async def _refresh(self, search_id: str, force: bool):
+        try:
+            await refresh_saved_search(search_id, self.scrape, force=force)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Saved search {search_id} refresh failed: {e}")
+        finally:
+            self._refreshing.pop(search_id, None)
+
+    async def _run(self):
+        while True:
+            try:
+                for definition in await list_saved_searches():
+                    if is_due(definition, await get_saved_status(definition["id"])):
+                        self.trigger(definition["id"])
+            except Exception as e:
+                print(f"❌ Saved search scheduler error: {e}")
+            await asyncio.sleep(SAVED_SEARCH_POLL_SECONDS)
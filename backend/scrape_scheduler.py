@@ -0,0 +1,296 @@
+"""
+Politeness scheduler for job board scrapes.
+
+Every scrape goes through a per-site queue before it reaches JobSpy. A scrape is
+only started when the site (and the global limiter) has a free concurrency slot,
+a token in its rate bucket, and is not backing off after a block. Slots, buckets
+and backoff live in the shared store, so the limits hold across all workers.
+
+Waiting scrapes are served round-robin per client, so one client queueing a lot
+of searches can't starve everyone else.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from shared_state import get_async_store, get_shared_store
+
+# per_minute/burst feed the token bucket, concurrency caps simultaneous scrapes,
+# backoff is the first pause (doubled on each repeat block) after a site blocks us
+DEFAULT_SITE_POLICIES = {
+    "linkedin": {"per_minute": 4, "burst": 1, "concurrency": 1, "backoff": 120},
+    "indeed": {"per_minute": 30, "burst": 5, "concurrency": 4, "backoff": 30},
+    "glassdoor": {"per_minute": 10, "burst": 2, "concurrency": 2, "backoff": 60},
+    "zip_recruiter": {"per_minute": 10, "burst": 2, "concurrency": 2, "backoff": 60},
+    "google": {"per_minute": 10, "burst": 2, "concurrency": 2, "backoff": 60},
+    "bayt": {"per_minute": 10, "burst": 2, "concurrency": 2, "backoff": 60},
+    "naukri": {"per_minute": 10, "burst": 2, "concurrency": 2, "backoff": 60},
+}
+FALLBACK_POLICY = {"per_minute": 10, "burst": 2, "concurrency": 2, "backoff": 60}
+
+GLOBAL_POLICY = {
+    "per_minute": int(os.getenv("SCRAPE_GLOBAL_PER_MINUTE", "60")),
+    "burst": int(os.getenv("SCRAPE_GLOBAL_BURST", "10")),
+    "concurrency": int(os.getenv("SCRAPE_GLOBAL_CONCURRENCY", "8")),
+}
+
+MAX_BACKOFF = int(os.getenv("SCRAPE_MAX_BACKOFF", "900"))  # Seconds
+SLOT_LEASE = int(os.getenv("SCRAPE_SLOT_LEASE", "900"))  # Seconds before a crashed worker's slot is reclaimed
+BACKOFF_LEVEL_TTL = MAX_BACKOFF * 4  # Escalation is forgotten this long after the last block
+
+# JobSpy logger names for each site, used to spot blocks it logs instead of raising
+SITE_LOGGERS = {
+    "linkedin": "JobSpy:LinkedIn",
+    "indeed": "JobSpy:Indeed",
+    "glassdoor": "JobSpy:Glassdoor",
+    "zip_recruiter": "JobSpy:ZipRecruiter",
+    "google": "JobSpy:Google",
+    "bayt": "JobSpy:Bayt",
+    "naukri": "JobSpy:Naukri",
+}
+BLOCK_PATTERN = re.compile(r"\b(429|403)\b|blocked|too many requests|rate limit", re.IGNORECASE)
+
+def load_site_policies() -> Dict[str, dict]:
+    """Default policies merged with overrides from SCRAPE_SITE_POLICIES (JSON)"""
+    policies = {site: dict(policy) for site, policy in DEFAULT_SITE_POLICIES.items()}
+    overrides = os.getenv("SCRAPE_SITE_POLICIES")
+    if overrides:
+        for site, values in json.loads(overrides).items():
+            policies.setdefault(site, dict(FALLBACK_POLICY)).update(values)
+    return policies
+
+SITE_POLICIES = load_site_policies()
+
+def get_site_policy(site: str) -> dict:
+    return SITE_POLICIES.get(site, FALLBACK_POLICY)
+
+def backoff_remaining(site: str) -> float:
+    """Seconds left before a blocked site may be scraped again"""
+    until = get_shared_store().get(f"backoff:{site}")
+    return max(0.0, float(until) - time.time()) if until else 0.0
+
+def report_block(site: str):
+    """Start (or escalate) backoff for a site; repeat reports during a backoff are ignored"""
+    store = get_shared_store()
+    if backoff_remaining(site) > 0:
+        return
+    level = store.incr(f"backoff_level:{site}", 1)
+    # Re-arm the level on every block, so a site that keeps blocking keeps escalating
+    store.set(f"backoff_level:{site}", str(level), ttl=BACKOFF_LEVEL_TTL)
+    delay = min(get_site_policy(site)["backoff"] * 2 ** (level - 1), MAX_BACKOFF)
+    if store.set(f"backoff:{site}", str(time.time() + delay), ttl=delay, nx=True):
+        print(f"🛑 {site} looks blocked, backing off for {delay:.0f}s")
+
+def report_success(site: str):
+    """A scrape finished without a block: the next block starts again from the first backoff"""
+    if backoff_remaining(site) == 0:
+        get_shared_store().delete(f"backoff_level:{site}")
+
+class BlockDetectionHandler(logging.Handler):
+    """Turns JobSpy's 'status code 429'/'blocked' log lines into backoff for that site"""
+
+    def __init__(self, site: str):
+        super().__init__(level=logging.WARNING)
+        self.site = site
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            if BLOCK_PATTERN.search(record.getMessage()):
+                report_block(self.site)
+        except Exception:
+            self.handleError(record)
+
+_block_detection_installed = False
+_block_detection_lock = threading.Lock()
+
+def install_block_detection():
+    """Attach block detection to JobSpy's per-site loggers"""
+    global _block_detection_installed
+    # JobSpy only gives its loggers a console handler if they have none yet, so it
+    # must set them up before ours is added or its own output is lost
+    import jobspy
+    with _block_detection_lock:
+        if _block_detection_installed:
+            return
+        for site, logger_name in SITE_LOGGERS.items():
+            logging.getLogger(logger_name).addHandler(BlockDetectionHandler(site))
+        _block_detection_installed = True
+
+def try_acquire_slot(scope: str, limit: int) -> Optional[Tuple[str, str]]:
+    """Claim one of `limit` shared concurrency slots, returning (key, token) or None"""
+    store = get_shared_store()
+    token = uuid.uuid4().hex
+    for i in range(limit):
+        key = f"slot:{scope}:{i}"
+        if store.set(key, token, ttl=SLOT_LEASE, nx=True):
+            return key, token
+    return None
+
+def release_slots(slots: List[Tuple[str, str]]):
+    store = get_shared_store()
+    for key, token in slots:
+        store.delete_if_equals(key, token)
+
+class ScrapeTicket:
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.future = asyncio.get_running_loop().create_future()
+
+class SiteScheduler:
+    """Fair per-client queue in front of one job site"""
+
+    def __init__(self, site: str):
+        self.site = site
+        self.policy = get_site_policy(site)
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()  # client_id -> waiting tickets
+        self._running = 0
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def fair_order(self) -> List[ScrapeTicket]:
+        """Waiting tickets in the order they will be served (one per client per round)"""
+        queues = [list(queue) for queue in self._queues.values()]
+        order = []
+        depth = 0
+        while True:
+            row = [queue[depth] for queue in queues if depth < len(queue)]
+            if not row:
+                return order
+            order.extend(row)
+            depth += 1
+
+    async def status(self, client_id: Optional[str] = None) -> dict:
+        order = self.fair_order()
+        status = {
+            "queued": len(order),
+            "running": self._running,
+            "backoff_seconds": round(await asyncio.to_thread(backoff_remaining, self.site), 1),
+            "policy": self.policy,
+        }
+        if client_id is not None:
+            status["your_positions"] = [
+                position for position, ticket in enumerate(order, start=1)
+                if ticket.client_id == client_id
+            ]
+        return status
+
+    async def run(self, client_id: str, scrape: Callable[[], Any]) -> Any:
+        """Wait for this client's turn, then run the (blocking) scrape in a thread"""
+        ticket = ScrapeTicket(client_id)
+        self._queues.setdefault(client_id, deque()).append(ticket)
+        self._ensure_dispatcher()
+
+        try:
+            slots = await ticket.future
+        except asyncio.CancelledError:
+            self._discard(ticket)
+            if ticket.future.done() and not ticket.future.cancelled():
+                await asyncio.to_thread(release_slots, ticket.future.result())
+            raise
+
+        self._running += 1
+        try:
+            result = await asyncio.to_thread(scrape)
+            # JobSpy logs most blocks instead of raising; those start a backoff, which keeps the level
+            await asyncio.to_thread(report_success, self.site)
+            return result
+        except Exception as e:
+            if BLOCK_PATTERN.search(str(e)):
+                await asyncio.to_thread(report_block, self.site)
+            raise
+        finally:
+            self._running -= 1
+            await asyncio.to_thread(release_slots, slots)
+            self._wakeup.set()
+
+    def _discard(self, ticket: ScrapeTicket):
+        queue = self._queues.get(ticket.client_id)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.client_id]
+
+    def _pop_next(self) -> Optional[ScrapeTicket]:
+        # Serve the client at the front of the rotation, then move it to the back
+        while self._queues:
+            client_id, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            if queue:
+                self._queues.move_to_end(client_id)
+            else:
+                del self._queues[client_id]
+            if not ticket.future.done():
+                return ticket
+        return None
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def _sleep(self, seconds: float):
+        """Sleep, but wake early when a local scrape finishes and frees a slot"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _dispatch(self):
+        # Shared store calls run in threads so a contended store never stalls the event loop
+        store = get_async_store()
+        while self._queues:
+            wait = await asyncio.to_thread(backoff_remaining, self.site)
+            if wait > 0:
+                await self._sleep(min(wait, 5))
+                continue
+
+            site_slot = await asyncio.to_thread(try_acquire_slot, self.site, self.policy["concurrency"])
+            global_slot = await asyncio.to_thread(try_acquire_slot, "global", GLOBAL_POLICY["concurrency"]) if site_slot else None
+            if not global_slot:
+                # Slots held by other workers are only released there, so poll
+                await asyncio.to_thread(release_slots, [site_slot] if site_slot else [])
+                await self._sleep(1)
+                continue
+            slots = [site_slot, global_slot]
+
+            # Both buckets are charged together or not at all, so waiting on a busy
+            # global bucket doesn't burn this site's tokens (and vice versa)
+            wait = await store.take_tokens([
+                (f"bucket:{self.site}", self.policy["per_minute"] / 60, self.policy["burst"]),
+                ("bucket:global", GLOBAL_POLICY["per_minute"] / 60, GLOBAL_POLICY["burst"]),
+            ])
+            if wait > 0:
+                await asyncio.to_thread(release_slots, slots)
+                await self._sleep(wait)
+                continue
+
+            ticket = self._pop_next()
+            if ticket is None:
+                await asyncio.to_thread(release_slots, slots)
+                break
+            ticket.future.set_result(slots)
+
+_schedulers: Dict[str, SiteScheduler] = {}
+
+def get_site_scheduler(site: str) -> SiteScheduler:
+    if site not in _schedulers:
+        _schedulers[site] = SiteScheduler(site)
+    return _schedulers[site]
+
+async def schedule_scrape(site: str, client_id: str, scrape: Callable[[], Any]) -> Any:
+    """Run a blocking scrape of one site once the politeness limits allow it"""
+    return await get_site_scheduler(site).run(client_id, scrape)
+
+async def scrape_queue_status(client_id: Optional[str] = None) -> Dict[str, dict]:
+    """Queue length, backoff and (optionally) a client's queue positions for every known site"""
+    sites = sorted(set(SITE_POLICIES) | set(_schedulers))
+    statuses = await asyncio.gather(*[get_site_scheduler(site).status(client_id) for site in sites])
+    return dict(zip(sites, statuses))
@@ -0,0 +1,419 @@
+"""
+Shared state for multi-worker deployments.
+
+Search result caching, single-flight scrape locks, OpenAI rate-limit budgets and
+scrape politeness state (token buckets, concurrency slots, backoff)
+live here instead of in process memory, so every uvicorn worker (and every node
+pointing at the same Redis) sees the same state.
+
+Backends are selected with SHARED_STORE_URL:
+- sqlite:///path/to/jobspy_state.db  (default, WAL mode, single host)
+- redis://host:6379/0                 (any Redis-compatible server, multi-node)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Optional, Sequence, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE_URL = f"sqlite:///{os.path.join(PROJECT_ROOT, 'jobspy_state.db')}"
+
+# (key, refill rate per second, capacity)
+Bucket = Tuple[str, float, float]
+
+def _refill_and_take(states: Sequence[Optional[str]], buckets: Sequence[Bucket], now: Optional[float] = None):
+    """
+    Token bucket step shared by both stores: refill every bucket, then take one
+    token from each only if all of them have one, so a bucket is never charged
+    for a request another bucket refuses. Returns (seconds to wait, new states).
+    """
+    now = time.time() if now is None else now
+    levels = []
+    for state, (_, rate, capacity) in zip(states, buckets):
+        if state:
+            tokens, updated = (float(part) for part in state.split(","))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+        else:
+            tokens = capacity
+        levels.append(tokens)
+
+    wait = max((1 - tokens) / rate for tokens, (_, rate, _) in zip(levels, buckets))
+    if wait <= 0:
+        levels = [tokens - 1 for tokens in levels]
+    return max(wait, 0.0), [f"{tokens},{now}" for tokens in levels]
+
+def _bucket_ttl(rate: float, capacity: float) -> float:
+    # Once a bucket has been idle long enough to refill completely it can be forgotten
+    return capacity / rate + 60
+
+class SQLiteStore:
+    """Redis-style key/value store backed by a SQLite database in WAL mode"""
+
+    # Expired rows are purged every this many writes
+    PURGE_EVERY = 256
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, and asyncio.to_thread
+        # may run us on any worker thread, so keep one connection per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _after_write(self, conn: sqlite3.Connection):
+        with self._writes_lock:
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:
+            conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    @staticmethod
+    def _expires_at(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl else None
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        """Store a value; with nx=True only if the key is missing or expired"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if nx:
+                existing = conn.execute(
+                    "SELECT 1 FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (key, time.time())
+                ).fetchone()
+                if existing:
+                    conn.execute("ROLLBACK")
+                    return False
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, self._expires_at(ttl))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._after_write(conn)
+        return True
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically increment a counter; ttl applies when the counter is created"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            if row:
+                value = int(row[0]) + amount
+                conn.execute("UPDATE kv SET value = ? WHERE key = ?", (str(value), key))
+            else:
+                value = amount
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, str(value), self._expires_at(ttl))
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._after_write(conn)
+        return value
+
+    def take_token(self, key: str, rate: float, capacity: float) -> float:
+        """Take one token from a bucket refilled at rate/sec; returns seconds to wait if empty"""
+        return self.take_tokens([(key, rate, capacity)])
+
+    def take_tokens(self, buckets: Sequence[Bucket]) -> float:
+        """Take one token from every bucket, or from none; returns seconds to wait if any is empty"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            states = []
+            for key, _, _ in buckets:
+                row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+                states.append(row[0] if row else None)
+            wait, values = _refill_and_take(states, buckets)
+            for (key, rate, capacity), value in zip(buckets, values):
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, self._expires_at(_bucket_ttl(rate, capacity)))
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._after_write(conn)
+        return wait
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def delete_if_equals(self, key: str, value: str) -> bool:
+        """Delete a key only if it still holds the given value (safe lock release)"""
+        cursor = self._conn().execute("DELETE FROM kv WHERE key = ? AND value = ?", (key, value))
+        return cursor.rowcount > 0
+
+    def expire_if_equals(self, key: str, value: str, ttl: float) -> bool:
+        """Reset a key's TTL only if it still holds the given value (lock renewal)"""
+        cursor = self._conn().execute(
+            "UPDATE kv SET expires_at = ? WHERE key = ? AND value = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self._expires_at(ttl), key, value, time.time())
+        )
+        return cursor.rowcount > 0
+
+class RedisStore:
+    """Same interface as SQLiteStore, served by any Redis-compatible server"""
+
+    def __init__(self, client):
+        self._client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisStore":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                "SHARED_STORE_URL points at Redis but the 'redis' package is not installed. "
+                "Install it with: pip install redis"
+            )
+        return cls(redis.Redis.from_url(url, decode_responses=True))
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        px = int(ttl * 1000) if ttl else None
+        return bool(self._client.set(key, value, px=px, nx=nx))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        value = self._client.incrby(key, amount)
+        if value == amount and ttl:
+            self._client.pexpire(key, int(ttl * 1000))
+        return value
+
+    def take_token(self, key: str, rate: float, capacity: float) -> float:
+        return self.take_tokens([(key, rate, capacity)])
+
+    def take_tokens(self, buckets: Sequence[Bucket]) -> float:
+        from redis.exceptions import WatchError
+        keys = [key for key, _, _ in buckets]
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(*keys)
+                    wait, values = _refill_and_take([pipe.get(key) for key in keys], buckets)
+                    pipe.multi()
+                    for (key, rate, capacity), value in zip(buckets, values):
+                        pipe.set(key, value, px=int(_bucket_ttl(rate, capacity) * 1000))
+                    pipe.execute()
+                    return wait
+                except WatchError:
+                    continue
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+    def delete_if_equals(self, key: str, value: str) -> bool:
+        from redis.exceptions import WatchError
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.get(key) != value:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def expire_if_equals(self, key: str, value: str, ttl: float) -> bool:
+        from redis.exceptions import WatchError
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.get(key) != value:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.pexpire(key, int(ttl * 1000))
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+class AsyncStore:
+    """
+    Awaitable view of a store. Every call runs on a worker thread, so waiting
+    for SQLite's write lock (or Redis) and (de)serializing large result sets
+    never stalls the event loop.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.store.get, key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        return await asyncio.to_thread(self.store.set, key, value, ttl, nx)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        return await asyncio.to_thread(self.store.incr, key, amount, ttl)
+
+    async def take_token(self, key: str, rate: float, capacity: float) -> float:
+        return await asyncio.to_thread(self.store.take_token, key, rate, capacity)
+
+    async def take_tokens(self, buckets: Sequence[Bucket]) -> float:
+        return await asyncio.to_thread(self.store.take_tokens, buckets)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.store.delete, key)
+
+    async def delete_if_equals(self, key: str, value: str) -> bool:
+        return await asyncio.to_thread(self.store.delete_if_equals, key, value)
+
+    async def expire_if_equals(self, key: str, value: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self.store.expire_if_equals, key, value, ttl)
+
+    async def get_json(self, key: str) -> Any:
+        def load():
+            value = self.store.get(key)
+            return json.loads(value) if value is not None else None
+        return await asyncio.to_thread(load)
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return await asyncio.to_thread(lambda: self.store.set(key, json.dumps(value, default=str), ttl=ttl))
+
+def create_store(url: str):
+    """Build a store from a sqlite:/// or redis:// URL"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore.from_url(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported SHARED_STORE_URL: {url}")
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_shared_store():
+    """Return this process's handle to the shared store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store(os.getenv("SHARED_STORE_URL", DEFAULT_STORE_URL))
+    return _store
+
+def get_async_store() -> AsyncStore:
+    """The shared store for use from async code"""
+    return AsyncStore(get_shared_store())
+
+def make_cache_key(prefix: str, params: dict) -> str:
+    """Stable cache key for a dict of request parameters"""
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{prefix}:{digest[:32]}"
+
+@asynccontextmanager
+async def renewed_lock(store: AsyncStore, key: str, token: str, ttl: float):
+    """
+    Keep a lock we hold alive for as long as the block runs. The TTL then only
+    has to cover a crashed holder; a slow one (e.g. a scrape waiting out a
+    site's backoff in the politeness queue) keeps extending it.
+    """
+    async def renew():
+        while True:
+            await asyncio.sleep(ttl / 3)
+            if not await store.expire_if_equals(key, token, ttl):
+                return
+
+    renewal = asyncio.create_task(renew())
+    try:
+        yield
+    finally:
+        renewal.cancel()
+        await asyncio.gather(renewal, return_exceptions=True)
+
+async def get_or_compute(
+    store: AsyncStore,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: float,
+    lock_timeout: float = 600,
+    poll_interval: float = 0.5
+) -> Any:
+    """
+    Return the cached JSON value for key, or compute it exactly once across all
+    workers. Callers that lose the race wait for the winner's result instead of
+    starting a duplicate scrape. The lock is renewed while compute() runs, so
+    lock_timeout only bounds how long a crashed worker holds up the others.
+    """
+    if ttl <= 0:
+        # Nothing will be cached, so waiting for another caller's result would only serialize scrapes
+        return await compute()
+
+    lock_key = f"lock:{key}"
+    token = uuid.uuid4().hex
+
+    while True:
+        cached = await store.get_json(key)
+        if cached is not None:
+            return cached
+
+        if await store.set(lock_key, token, ttl=lock_timeout, nx=True):
+            try:
+                async with renewed_lock(store, lock_key, token, lock_timeout):
+                    value = await compute()
+                await store.set_json(key, value, ttl=ttl)
+                return value
+            finally:
+                await store.delete_if_equals(lock_key, token)
+
+        # Someone else is computing this key; wait for the result or for the lock to free up
+        await asyncio.sleep(poll_interval)
+
+async def acquire_rate_budget(store: AsyncStore, name: str, limit: int, window_seconds: float = 60):
+    """
+    Take one unit from a fixed-window budget shared by all workers, sleeping
+    until the next window when the current one is used up. limit <= 0 disables it.
+    """
+    if limit <= 0:
+        return
+    while True:
+        now = time.time()
+        window = int(now // window_seconds)
+        count = await store.incr(f"rate:{name}:{window}", 1, ttl=window_seconds * 2)
+        if count <= limit:
+            return
+        wait = (window + 1) * window_seconds - now
+        await asyncio.sleep(wait + random.uniform(0, 0.25))
@@ -11,21 +11,41 @@ import webbrowser
 import time
 import os
 import sys
+import importlib.util
 from pathlib import Path
 
+# How long to wait for the backend to report ready before giving up
+READY_TIMEOUT = 60
+
 def check_dependencies():
-    """Check if required dependencies are installed"""
-    try:
-        import fastapi
-        import uvicorn
-        import jobspy
-        import pandas
-        print("✅ All dependencies are installed!")
-        return True
-    except ImportError as e:
-        print(f"❌ Missing dependency: {e.name}")
-        print("Please install dependencies with: pip install -r requirements.txt")
-        return False
+    """Check if required dependencies are installed (without importing them)"""
+    for module in ["fastapi", "uvicorn", "jobspy", "pandas"]:
+        if importlib.util.find_spec(module) is None:
+            print(f"❌ Missing dependency: {module}")
+            print("Please install dependencies with: pip install -r requirements.txt")
+            return False
+    print("✅ All dependencies are installed!")
+    return True
+
+def wait_until_ready(process, url="http://localhost:8000/ready", timeout=READY_TIMEOUT):
+    """Poll the readiness endpoint with exponential backoff until it answers 200"""
+    import requests
+    
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            print(f"❌ Backend exited with code {process.returncode}")
+            return False
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass  # Not listening yet
+        time.sleep(delay)
+        delay = min(delay * 2, 2)
+    print(f"❌ Backend was not ready after {timeout} seconds")
+    return False
 
 def start_backend():
     """Start the FastAPI backend server"""
@@ -41,22 +61,13 @@ def start_backend():
             sys.executable, str(backend_path)
         ], cwd=".")
         
-        # Give the server time to start
-        time.sleep(3)
-        
-        # Check if server is running
-        import requests
-        try:
-            response = requests.get("http://localhost:8000/health", timeout=5)
-            if response.status_code == 200:
-                print("✅ Backend server is running on http://localhost:8000")
-                print("📚 API Documentation: http://localhost:8000/docs")
-                return process
-            else:
-                print("❌ Backend server responded but not healthy")
-                return None
-        except requests.exceptions.RequestException:
-            print("❌ Could not connect to backend server")
+        # Wait for the server to report ready instead of sleeping a fixed time
+        if wait_until_ready(process):
+            print("✅ Backend server is running on http://localhost:8000")
+            print("📚 API Documentation: http://localhost:8000/docs")
+            return process
+        else:
+            process.terminate()
             return None
             
     except Exception as e:
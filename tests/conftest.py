@@ -0,0 +1,16 @@
+import os
+import sys
+
+# The backend modules import each other as top-level modules (uvicorn runs them with app_dir=backend)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import pytest
+
+import shared_state
+
+@pytest.fixture
+def shared_store(tmp_path, monkeypatch):
+    """A fresh SQLite shared store, used by everything that calls get_shared_store()"""
+    store = shared_state.SQLiteStore(str(tmp_path / "state.db"))
+    monkeypatch.setattr(shared_state, "_store", store)
+    return store
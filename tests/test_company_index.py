@@ -0,0 +1,56 @@
+from company_index import CompanyIndex, get_company_index, normalize_company
+
+def jobs(*companies):
+    return [{"id": f"job-{i}", "company": company} for i, company in enumerate(companies)]
+
+def test_normalize_strips_punctuation_and_legal_suffixes():
+    assert normalize_company("Uber Technologies, Inc.") == "uber technologies"
+    assert normalize_company("The Walt Disney Company") == "walt disney"
+    assert normalize_company("AT&T Corp.") == "at and t"
+
+def test_normalize_keeps_a_name_that_is_only_a_suffix():
+    assert normalize_company("Company") == "company"
+
+def test_normalize_maps_aliases():
+    assert normalize_company("Facebook") == "meta"
+    assert normalize_company("Meta Platforms, Inc.") == "meta"
+    assert normalize_company("Meta Platforms Ireland Ltd") == "meta ireland"
+
+def test_normalize_handles_missing_names():
+    assert normalize_company(None) == ""
+    assert normalize_company("") == ""
+    assert normalize_company(float("nan")) == ""
+
+def test_exact_match():
+    index = CompanyIndex(jobs("Uber", "Uber Freight", "uber, inc."))
+    assert index.rows(["Uber"], "exact") == [0, 2]
+
+def test_prefix_match_is_whole_word():
+    index = CompanyIndex(jobs("Uber", "Uber Freight", "Uberall", "Lyft"))
+    assert index.rows(["uber"], "prefix") == [0, 1]
+
+def test_alias_query_finds_canonical_company():
+    index = CompanyIndex(jobs("Meta", "Google", "Amazon.com Services LLC"))
+    assert index.rows(["Facebook"], "prefix") == [0]
+    assert index.rows(["Amazon"], "prefix") == [2]
+
+def test_fuzzy_match_finds_close_spellings():
+    index = CompanyIndex(jobs("Google", "Lyft", "Microsoft"))
+    assert index.rows(["gogle"], "prefix") == []
+    assert index.rows(["gogle"], "fuzzy") == [0]
+    assert index.rows(["Microsfot"], "fuzzy") == [2]
+
+def test_several_companies_keep_result_order():
+    index = CompanyIndex(jobs("Lyft", "Uber", "Meta", "Uber"))
+    assert index.rows(["uber", "lyft"]) == [0, 1, 3]
+
+def test_cached_index_is_reused_for_the_same_jobs():
+    result = jobs("Uber", "Lyft")
+    assert get_company_index(result, "test-reuse") is get_company_index(list(result), "test-reuse")
+
+def test_cached_index_is_rebuilt_when_rescraped_rows_change():
+    # Same key, length and first/last ids, different middle rows
+    first = jobs("Uber", "Lyft", "Meta")
+    rescraped = jobs("Uber", "Apple", "Meta")
+    assert get_company_index(first, "test-rescrape").rows(["lyft"]) == [1]
+    assert get_company_index(rescraped, "test-rescrape").rows(["lyft"]) == []
@@ -0,0 +1,120 @@
+import dedup
+from dedup import MAX_CANDIDATES, deduplicate_jobs, merge_duplicates, normalize_location, normalize_title
+
+DESCRIPTION = (
+    "We are looking for a senior product manager to own the rider pricing roadmap, work with "
+    "engineering and data science, run experiments and ship features used by millions of riders "
+    "every day across our marketplace in North America and beyond. "
+) * 3
+
+def job(site, job_id, title="Senior Product Manager", company="Uber", location="San Francisco, CA", description=DESCRIPTION, **fields):
+    return {
+        "id": job_id, "site": site, "job_url": f"https://{site}.example/{job_id}",
+        "title": title, "company": company, "location": location, "description": description, **fields
+    }
+
+def test_normalizers():
+    assert normalize_title("Sr. Product Mgr") == "senior product manager"
+    assert normalize_location("San Francisco, CA, US") == normalize_location("San Francisco, CA") == "san francisco ca"
+
+def test_same_posting_on_two_sites_is_merged():
+    jobs, collapsed = deduplicate_jobs([job("indeed", "in-1"), job("linkedin", "li-1", location="San Francisco, CA, US")])
+    assert collapsed == 1
+    assert len(jobs) == 1
+    assert {source["site"] for source in jobs[0]["sources"]} == {"indeed", "linkedin"}
+    assert jobs[0]["duplicate_count"] == 1
+
+def test_reworded_title_and_company_are_merged_by_description():
+    jobs, collapsed = deduplicate_jobs([
+        job("indeed", "in-1", title="Sr. PM, Pricing"),
+        job("glassdoor", "gd-1", company="Uber Technologies, Inc."),
+    ])
+    assert collapsed == 1
+
+def test_different_descriptions_with_same_title_are_kept():
+    other = "Lead the driver onboarding team, hire engineers and own the identity verification platform. " * 4
+    jobs, collapsed = deduplicate_jobs([job("indeed", "in-1"), job("linkedin", "li-1", description=other)])
+    assert collapsed == 0
+    assert len(jobs) == 2
+
+def test_same_site_postings_are_never_merged():
+    # Separate requisitions often share a title and boilerplate description
+    jobs, collapsed = deduplicate_jobs([job("indeed", f"in-{i}") for i in range(5)])
+    assert collapsed == 0
+    assert len(jobs) == 5
+
+def test_group_holds_at_most_one_posting_per_site():
+    jobs, collapsed = deduplicate_jobs([job("indeed", "in-1"), job("indeed", "in-2"), job("linkedin", "li-1")])
+    assert collapsed == 1
+    for merged in jobs:
+        sites = [source["site"] for source in merged.get("sources", [])]
+        assert len(sites) == len(set(sites))
+
+def test_merge_keeps_most_complete_copy_and_fills_gaps():
+    merged = merge_duplicates([
+        job("indeed", "in-1", min_amount=None, company_url="https://uber.com"),
+        job("linkedin", "li-1", min_amount=150000, company_url=None, job_level="senior"),
+    ])
+    assert merged["id"] == "li-1"
+    assert merged["min_amount"] == 150000
+    assert merged["company_url"] == "https://uber.com"
+    assert [source["id"] for source in merged["sources"]] == ["in-1", "li-1"]
+
+def test_previously_merged_jobs_keep_their_sources():
+    merged, _ = deduplicate_jobs([job("indeed", "in-1"), job("linkedin", "li-1")])
+    jobs, collapsed = deduplicate_jobs(merged + [job("glassdoor", "gd-1")])
+    assert collapsed == 1
+    assert {source["site"] for source in jobs[0]["sources"]} == {"indeed", "linkedin", "glassdoor"}
+    assert jobs[0]["duplicate_count"] == 2
+
+def test_previously_merged_job_does_not_absorb_another_posting_from_its_sites():
+    merged, _ = deduplicate_jobs([job("indeed", "in-1"), job("linkedin", "li-1")])
+    jobs, collapsed = deduplicate_jobs(merged + [job("indeed", "in-2")])
+    assert collapsed == 0
+
+def test_previously_merged_job_absorbs_a_new_copy_of_its_own_posting():
+    merged, _ = deduplicate_jobs([job("indeed", "in-1"), job("linkedin", "li-1")])
+    jobs, collapsed = deduplicate_jobs(merged + [job("indeed", "in-1")])
+    assert collapsed == 1
+
+def count_comparisons(monkeypatch, jobs):
+    calls = []
+    can_union = dedup._DisjointSet.can_union
+    monkeypatch.setattr(dedup._DisjointSet, "can_union", lambda self, i, j: calls.append(1) or can_union(self, i, j))
+    result = deduplicate_jobs(jobs)
+    return result, len(calls)
+
+def test_same_site_boilerplate_is_not_compared_pairwise(monkeypatch):
+    (jobs, collapsed), comparisons = count_comparisons(monkeypatch, [job("indeed", f"in-{i}") for i in range(2000)])
+    assert collapsed == 0
+    assert comparisons == 0  # No open group lacks an indeed posting
+
+def test_comparisons_per_job_are_capped(monkeypatch):
+    # Two sites, one title, all different descriptions: nothing merges but every job has open candidates
+    jobs = [
+        job(("indeed", "linkedin")[i % 2], f"job-{i}", description=" ".join(f"w{i}x{k}" for k in range(40)))
+        for i in range(1000)
+    ]
+    (_, collapsed), comparisons = count_comparisons(monkeypatch, jobs)
+    assert collapsed == 0
+    assert comparisons <= 2 * MAX_CANDIDATES * len(jobs)
+
+def test_cross_site_copies_of_boilerplate_all_merge():
+    indeed = [job("indeed", f"in-{i}") for i in range(500)]
+    linkedin = [job("linkedin", f"li-{i}") for i in range(500)]
+    jobs, collapsed = deduplicate_jobs(indeed + linkedin)
+    assert collapsed == 500
+    assert all(sorted(source["site"] for source in merged["sources"]) == ["indeed", "linkedin"] for merged in jobs)
+
+def test_malformed_sources_are_ignored():
+    jobs, collapsed = deduplicate_jobs([
+        job("indeed", "in-1", sources=[{"site": "indeed"}]),
+        job("linkedin", "li-1", sources="not a list"),
+        job("glassdoor", "gd-1", sources=[None, 3]),
+    ])
+    assert len(jobs) + collapsed == 3
+    merge_duplicates([job("indeed", "in-1", sources=[{"site": "indeed"}]), job("linkedin", "li-1")])
+
+def test_jobs_without_site_are_not_merged():
+    jobs, collapsed = deduplicate_jobs([job(None, "a"), job(None, "b")])
+    assert collapsed == 0
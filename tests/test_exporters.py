@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+
+import pytest
+
+from exporters import ExportError, stream_export
+
+JOBS = [
+    {
+        "title": '=HYPERLINK("http://evil","click")', "company": "+Acme", "location": "-Remote", "site": "@indeed",
+        "min_amount": -5, "max_amount": 120000.5, "is_remote": True, "description": "Plain text",
+        "sources": [{"site": "indeed", "id": "in-1"}, {"site": "linkedin", "id": "li-1"}],
+    },
+    {
+        "title": "Product Manager", "company": "Uber", "location": None, "site": "linkedin",
+        "min_amount": 90000, "max_amount": None, "is_remote": False, "description": None, "sources": None,
+    },
+]
+
+def export(jobs, export_format, columns=None):
+    return b"".join(stream_export(jobs, export_format, columns))
+
+def test_csv_escapes_formula_like_text_but_not_numbers():
+    rows = list(csv.DictReader(io.StringIO(export(JOBS, "csv").decode("utf-8"))))
+    assert rows[0]["title"] == '\'=HYPERLINK("http://evil","click")'
+    assert rows[0]["company"] == "'+Acme"
+    assert rows[0]["location"] == "'-Remote"
+    assert rows[0]["site"] == "'@indeed"
+    assert rows[0]["min_amount"] == "-5"
+    assert rows[0]["description"] == "Plain text"
+    assert rows[1]["location"] == ""
+
+def test_csv_writes_nested_values_as_json():
+    rows = list(csv.DictReader(io.StringIO(export(JOBS, "csv").decode("utf-8"))))
+    assert json.loads(rows[0]["sources"]) == JOBS[0]["sources"]
+
+def test_csv_columns_are_selected_and_ordered():
+    text = export(JOBS, "csv", ["company", "title"]).decode("utf-8")
+    assert text.splitlines()[0] == "company,title"
+
+def test_xlsx_writes_formula_like_text_as_strings():
+    openpyxl = pytest.importorskip("openpyxl")
+    sheet = openpyxl.load_workbook(io.BytesIO(export(JOBS, "xlsx"))).active
+    header = [cell.value for cell in sheet[1]]
+    row = dict(zip(header, sheet[2]))
+    assert row["title"].value == '=HYPERLINK("http://evil","click")'
+    assert row["title"].data_type == "s"
+    assert row["company"].data_type == "s"
+    assert row["min_amount"].value == -5
+    assert row["min_amount"].data_type == "n"
+    assert json.loads(row["sources"].value) == JOBS[0]["sources"]
+
+def test_parquet_types_columns_and_writes_nested_values_as_json():
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(export(JOBS, "parquet")))
+    types = {field.name: str(field.type) for field in table.schema}
+    assert types["min_amount"] == "int64"
+    assert types["max_amount"] == "double"
+    assert types["is_remote"] == "bool"
+    assert types["title"] == "string"
+    assert types["sources"] == "string"
+    rows = table.to_pylist()
+    assert json.loads(rows[0]["sources"]) == JOBS[0]["sources"]
+    assert rows[1]["sources"] is None
+    assert rows[0]["title"] == JOBS[0]["title"]  # Parquet isn't opened as a spreadsheet, so no escaping
+
+def test_export_streams_in_batches():
+    jobs = [{"id": i, "title": f"Job {i}"} for i in range(1200)]
+    chunks = list(stream_export(jobs, "csv"))
+    assert len(chunks) > 1
+    assert len(b"".join(chunks).decode("utf-8").splitlines()) == 1201
+
+def test_unknown_columns_and_formats_raise_export_error():
+    with pytest.raises(ExportError, match="Unknown columns"):
+        stream_export(JOBS, "csv", ["title", "salary_band"])
+    with pytest.raises(ExportError, match="Unsupported format"):
+        stream_export(JOBS, "pdf")
+
+def test_export_endpoint_turns_export_errors_into_400(shared_store):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    shared_store.set("saved_search:abc", json.dumps({"id": "abc", "name": "PMs", "request": {}}))
+    shared_store.set("saved_results:abc", json.dumps({"jobs": JOBS, "refreshed_at": 0}))
+    client = TestClient(main.app)
+
+    response = client.get("/export", params={"saved_search_id": "abc", "columns": ["salary_band"]})
+    assert response.status_code == 400
+    assert "Unknown columns" in response.json()["detail"]
+
+    response = client.get("/export", params={"saved_search_id": "abc", "columns": ["title"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import saved_searches
+from saved_searches import (
+    create_saved_search, get_saved_status, is_due, merge_jobs, refresh_saved_search, refresh_window_hours
+)
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).date().isoformat()
+
+def definition(hours_old=720, refresh_minutes=60, refresh_hours_old=None):
+    return {"request": {"hours_old": hours_old}, "refresh_minutes": refresh_minutes, "refresh_hours_old": refresh_hours_old}
+
+def test_merge_jobs_adds_new_and_updates_existing_postings():
+    existing = [{"id": "a", "title": "old", "date_posted": days_ago(2)}, {"id": "b", "date_posted": days_ago(3)}]
+    fresh = [{"id": "a", "title": "new", "date_posted": days_ago(2)}, {"id": "c", "date_posted": days_ago(0)}]
+    merged = merge_jobs(existing, fresh, None)
+    assert [job["id"] for job in merged] == ["c", "a", "b"]  # Newest first
+    assert merged[1]["title"] == "new"
+
+def test_merge_jobs_drops_postings_past_hours_old():
+    existing = [{"id": "old", "date_posted": days_ago(10)}, {"id": "undated", "date_posted": None}]
+    merged = merge_jobs(existing, [{"id": "new", "date_posted": days_ago(1)}], 24 * 5)
+    assert {job["id"] for job in merged} == {"new", "undated"}
+
+def test_first_refresh_is_full():
+    assert refresh_window_hours(definition(), None) is None
+
+def test_refresh_window_covers_time_since_last_refresh():
+    results = {"refreshed_at": time.time() - 4.5 * 3600}  # Rounded up, plus an hour of overlap
+    assert refresh_window_hours(definition(), results) == 6
+    assert refresh_window_hours(definition(refresh_hours_old=24), results) == 24
+
+def test_refresh_window_wider_than_hours_old_is_a_full_refresh():
+    results = {"refreshed_at": time.time() - 100 * 3600}
+    assert refresh_window_hours(definition(hours_old=48), results) is None
+
+def test_is_due():
+    assert is_due(definition(), None)
+    assert not is_due(definition(refresh_minutes=60), {"refreshed_at": time.time() - 30 * 60})
+    assert is_due(definition(refresh_minutes=60), {"refreshed_at": time.time() - 61 * 60})
+
+def test_refresh_writes_status_and_due_checks_skip_stored_jobs(shared_store, monkeypatch):
+    scraped = []
+
+    async def scrape(request, hours_old, client_id):
+        scraped.append(hours_old)
+        return [{"id": f"job-{len(scraped)}", "date_posted": days_ago(0)}]
+
+    async def main():
+        definition = await create_saved_search("PMs", {"hours_old": 720, "site_name": ["indeed"]}, 60, None)
+        first = await refresh_saved_search(definition["id"], scrape)
+        # Not due yet: decided from the status record alone
+        monkeypatch.setattr(saved_searches, "get_saved_results", fail_if_called)
+        skipped = await refresh_saved_search(definition["id"], scrape)
+        return definition, first, skipped, await get_saved_status(definition["id"])
+
+    definition, first, skipped, status = asyncio.run(main())
+    assert scraped == [720]
+    assert skipped is None
+    assert status["job_count"] == 1
+    assert status["last_new_jobs"] == 1
+    assert status["refreshed_at"] == first["refreshed_at"]
+
+async def fail_if_called(search_id):
+    raise AssertionError("stored jobs were loaded")
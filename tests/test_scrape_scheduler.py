@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+import pytest
+
+import scrape_scheduler
+from scrape_scheduler import (
+    BACKOFF_LEVEL_TTL, SiteScheduler, backoff_remaining, report_block, report_success, schedule_scrape, try_acquire_slot
+)
+
+def about(seconds):
+    return pytest.approx(seconds, abs=1)
+
+def backoff_delay(store, site):
+    return float(store.get(f"backoff:{site}")) - time.time()
+
+def end_backoff(store, site):
+    store.delete(f"backoff:{site}")
+
+def level_expires_at(store, site):
+    return store._conn().execute("SELECT expires_at FROM kv WHERE key = ?", (f"backoff_level:{site}",)).fetchone()[0]
+
+def test_repeat_blocks_escalate_backoff(shared_store):
+    report_block("indeed")
+    assert backoff_delay(shared_store, "indeed") == about(30)
+    report_block("indeed")  # Ignored while backing off
+    assert shared_store.get("backoff_level:indeed") == "1"
+
+    end_backoff(shared_store, "indeed")
+    report_block("indeed")
+    assert backoff_delay(shared_store, "indeed") == about(60)
+
+def test_backoff_is_capped(shared_store, monkeypatch):
+    monkeypatch.setattr(scrape_scheduler, "MAX_BACKOFF", 100)
+    for _ in range(5):
+        end_backoff(shared_store, "indeed")
+        report_block("indeed")
+    assert backoff_delay(shared_store, "indeed") == about(100)
+
+def test_each_block_rearms_escalation_level(shared_store):
+    report_block("indeed")
+    shared_store._conn().execute("UPDATE kv SET expires_at = ? WHERE key = 'backoff_level:indeed'", (time.time() + 5,))
+    end_backoff(shared_store, "indeed")
+    report_block("indeed")
+    assert level_expires_at(shared_store, "indeed") == about(time.time() + BACKOFF_LEVEL_TTL)
+    assert shared_store.get("backoff_level:indeed") == "2"
+
+def test_success_resets_escalation(shared_store):
+    report_block("indeed")
+    report_success("indeed")  # Still backing off: a scrape that logged the block keeps its level
+    assert shared_store.get("backoff_level:indeed") == "1"
+
+    end_backoff(shared_store, "indeed")
+    report_success("indeed")
+    assert shared_store.get("backoff_level:indeed") is None
+    report_block("indeed")
+    assert backoff_delay(shared_store, "indeed") == about(30)
+    assert backoff_remaining("indeed") > 0
+
+async def queue_tickets(scheduler, client_ids):
+    """Queue one scrape per client id without dispatching any of them"""
+    scheduler._ensure_dispatcher = lambda: None
+    tasks = [asyncio.create_task(scheduler.run(client_id, lambda: None)) for client_id in client_ids]
+    await asyncio.sleep(0)
+    return tasks
+
+async def cancel_all(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+def test_waiting_scrapes_are_served_round_robin_per_client(shared_store):
+    async def main():
+        scheduler = SiteScheduler("indeed")
+        tasks = await queue_tickets(scheduler, ["a", "a", "a", "b", "c", "b"])
+        planned = [ticket.client_id for ticket in scheduler.fair_order()]
+        served = []
+        while True:
+            ticket = scheduler._pop_next()
+            if ticket is None:
+                break
+            served.append(ticket.client_id)
+        await cancel_all(tasks)
+        return planned, served
+
+    planned, served = asyncio.run(main())
+    assert planned == ["a", "b", "c", "a", "b", "a"]
+    assert served == planned
+
+def test_status_reports_client_positions(shared_store):
+    async def main():
+        scheduler = SiteScheduler("indeed")
+        tasks = await queue_tickets(scheduler, ["a", "a", "b"])
+        status = await scheduler.status("a")
+        await cancel_all(tasks)
+        return status
+
+    status = asyncio.run(main())
+    assert status["queued"] == 3
+    assert status["your_positions"] == [1, 3]
+
+def test_cancelled_queued_scrape_leaves_the_queue(shared_store):
+    async def main():
+        scheduler = SiteScheduler("indeed")
+        tasks = await queue_tickets(scheduler, ["a", "b"])
+        await cancel_all(tasks[:1])
+        order = [ticket.client_id for ticket in scheduler.fair_order()]
+        await cancel_all(tasks)
+        return order
+
+    assert asyncio.run(main()) == ["b"]
+
+def test_scrape_cancelled_after_its_slots_were_granted_releases_them(shared_store):
+    async def main():
+        scheduler = SiteScheduler("indeed")
+        [task] = await queue_tickets(scheduler, ["a"])
+        # Grant slots the way the dispatcher does, then cancel before the scrape starts
+        slots = [try_acquire_slot("indeed", 1), try_acquire_slot("global", 1)]
+        scheduler._pop_next().future.set_result(slots)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return slots
+
+    slots = asyncio.run(main())
+    assert all(shared_store.get(key) is None for key, _ in slots)
+
+def test_scrapes_run_and_release_slots(shared_store, monkeypatch):
+    monkeypatch.setitem(scrape_scheduler.SITE_POLICIES, "test-site", {"per_minute": 600, "burst": 5, "concurrency": 1, "backoff": 1})
+    monkeypatch.setattr(scrape_scheduler, "_schedulers", {})
+
+    async def main():
+        results = await asyncio.gather(*[
+            schedule_scrape("test-site", client_id, lambda n=n: n) for n, client_id in enumerate(["a", "b", "a"])
+        ])
+        return results
+
+    assert asyncio.run(main()) == [0, 1, 2]
+    assert try_acquire_slot("test-site", 1) is not None
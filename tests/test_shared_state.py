@@ -0,0 +1,168 @@
+import asyncio
+import time
+
+import pytest
+
+import shared_state
+from shared_state import SQLiteStore, _refill_and_take, acquire_rate_budget, get_async_store, get_or_compute
+
+SITE = ("bucket:site", 1.0, 2)  # 1 token/sec, burst 2
+GLOBAL = ("bucket:global", 0.5, 1)
+
+def tokens(state):
+    return float(state.split(",")[0])
+
+def all_keys(store):
+    return [row[0] for row in store._conn().execute("SELECT key FROM kv")]
+
+def test_new_bucket_starts_full():
+    wait, states = _refill_and_take([None], [SITE], now=100)
+    assert wait == 0
+    assert tokens(states[0]) == 1
+
+def test_empty_bucket_reports_wait_until_next_token():
+    wait, states = _refill_and_take(["0.25,100"], [SITE], now=100)
+    assert wait == pytest.approx(0.75)
+    assert tokens(states[0]) == 0.25
+
+def test_bucket_refills_over_time_up_to_capacity():
+    wait, states = _refill_and_take(["0,100"], [SITE], now=101.5)
+    assert wait == 0
+    assert tokens(states[0]) == pytest.approx(0.5)
+    _, states = _refill_and_take(["0,100"], [SITE], now=1000)
+    assert tokens(states[0]) == 1  # Capacity 2, minus the token taken
+
+def test_clock_going_backwards_does_not_drain_bucket():
+    _, states = _refill_and_take(["1,100"], [SITE], now=99)
+    assert tokens(states[0]) == 0
+
+def test_no_bucket_is_charged_when_another_is_empty():
+    wait, states = _refill_and_take(["2,100", "0,100"], [SITE, GLOBAL], now=100)
+    assert wait == pytest.approx(2)
+    assert tokens(states[0]) == 2
+    assert tokens(states[1]) == 0
+
+def test_all_buckets_are_charged_together():
+    wait, states = _refill_and_take(["2,100", "1,100"], [SITE, GLOBAL], now=100)
+    assert wait == 0
+    assert [tokens(state) for state in states] == [1, 0]
+
+def test_sqlite_take_tokens(tmp_path):
+    store = SQLiteStore(str(tmp_path / "state.db"))
+    buckets = [("bucket:linkedin", 4 / 60, 1), ("bucket:global", 1 / 60, 2)]
+    assert store.take_tokens(buckets) == 0
+    assert store.take_tokens(buckets) > 0  # linkedin is empty now
+    assert tokens(store.get("bucket:global")) == pytest.approx(1, abs=0.01)  # and global was not charged
+
+def test_sqlite_set_nx_only_sets_missing_or_expired_keys(shared_store):
+    assert shared_store.set("lock", "a", nx=True)
+    assert not shared_store.set("lock", "b", nx=True)
+    assert shared_store.get("lock") == "a"
+    shared_store.set("short", "x", ttl=0.01)
+    time.sleep(0.02)
+    assert shared_store.get("short") is None
+    assert shared_store.set("short", "y", ttl=10, nx=True)
+
+def test_sqlite_delete_if_equals_only_deletes_own_value(shared_store):
+    shared_store.set("lock", "mine")
+    assert not shared_store.delete_if_equals("lock", "theirs")
+    assert shared_store.get("lock") == "mine"
+    assert shared_store.delete_if_equals("lock", "mine")
+    assert shared_store.get("lock") is None
+
+def test_get_or_compute_runs_concurrent_callers_once(shared_store):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"jobs": [1, 2]}
+
+    async def main():
+        store = get_async_store()
+        return await asyncio.gather(*[
+            get_or_compute(store, "search:same", compute, ttl=60, poll_interval=0.01) for _ in range(5)
+        ])
+
+    assert asyncio.run(main()) == [{"jobs": [1, 2]}] * 5
+    assert len(calls) == 1
+    assert shared_store.get("lock:search:same") is None
+
+def test_get_or_compute_without_ttl_neither_caches_nor_queues(shared_store):
+    running = []
+    peak = []
+
+    async def compute():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.pop()
+        return "fresh"
+
+    async def main():
+        store = get_async_store()
+        return await asyncio.gather(*[get_or_compute(store, "search:nocache", compute, ttl=0) for _ in range(3)])
+
+    assert asyncio.run(main()) == ["fresh"] * 3
+    assert max(peak) == 3  # All ran at once instead of one after another
+    assert shared_store.get("search:nocache") is None
+
+def test_get_or_compute_releases_lock_when_compute_fails(shared_store):
+    async def compute():
+        raise RuntimeError("scrape failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(get_or_compute(get_async_store(), "search:fails", compute, ttl=60))
+    assert shared_store.get("lock:search:fails") is None
+
+def test_acquire_rate_budget_waits_for_next_window(shared_store, monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        # Skip ahead to the next window by dropping the current one's counter
+        shared_store.delete(next(key for key in all_keys(shared_store) if key.startswith("rate:openai")))
+
+    monkeypatch.setattr(shared_state.asyncio, "sleep", fake_sleep)
+
+    async def main():
+        store = get_async_store()
+        for _ in range(3):
+            await acquire_rate_budget(store, "openai", limit=2, window_seconds=60)
+
+    asyncio.run(main())
+    assert len(sleeps) == 1
+    assert 0 < sleeps[0] <= 60.25
+
+def test_acquire_rate_budget_disabled_with_zero_limit(shared_store):
+    asyncio.run(acquire_rate_budget(get_async_store(), "openai", limit=0))
+    assert all_keys(shared_store) == []
+
+def test_sqlite_expire_if_equals_only_renews_own_live_lock(shared_store):
+    shared_store.set("lock", "mine", ttl=0.05)
+    assert not shared_store.expire_if_equals("lock", "theirs", 60)
+    assert shared_store.expire_if_equals("lock", "mine", 60)
+    time.sleep(0.1)
+    assert shared_store.get("lock") == "mine"
+    shared_store.set("expired", "mine", ttl=0.01)
+    time.sleep(0.02)
+    assert not shared_store.expire_if_equals("expired", "mine", 60)
+
+def test_get_or_compute_lock_outlives_its_timeout_while_computing(shared_store):
+    # A scrape queued behind a site's backoff can take longer than the lock timeout
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.5)
+        return "jobs"
+
+    async def main():
+        store = get_async_store()
+        first = asyncio.create_task(get_or_compute(store, "search:slow", compute, ttl=60, lock_timeout=0.15))
+        await asyncio.sleep(0.05)
+        second = get_or_compute(store, "search:slow", compute, ttl=60, lock_timeout=0.15, poll_interval=0.02)
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(main()) == ["jobs", "jobs"]
+    assert len(calls) == 1